@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from file_interactions import FileInteractions
+
+# Share of transactions per currency and median amount in cents, amounts are log-normally distributed around it
+CURRENCY_MIX = {'PLN': (0.6, 15000), 'EUR': (0.25, 8000), 'USD': (0.15, 9000)}
+# Counter field has 6 digits, bigger files can not be represented in this format
+MAX_TRANSACTIONS = 999999
+
+
+def generate_transactions(transactions_count: int, seed: int = 0) -> pd.DataFrame:
+    random = np.random.default_rng(seed)
+    currencies = list(CURRENCY_MIX)
+    shares = np.array([share for share, _ in CURRENCY_MIX.values()])
+    currency_codes = random.choice(len(currencies), size=transactions_count, p=shares / shares.sum())
+    medians = np.array([median for _, median in CURRENCY_MIX.values()])[currency_codes]
+    amounts = np.minimum(random.lognormal(np.log(medians), 1.2), 10 ** 9).astype(np.int64)
+    return pd.DataFrame({'Field id': '02',
+                         'Counter': np.arange(1, transactions_count + 1, dtype=np.int32),
+                         'Amount': amounts,
+                         'Currency': pd.Categorical.from_codes(currency_codes, categories=currencies),
+                         'Reserved': ''})
+
+
+def generate_file(filename: str, transactions_count: int, seed: int = 0) -> str:
+    # File is written by the same formatting code as write_to_file, so it is always valid for FileInteractions
+    if not 0 <= transactions_count <= MAX_TRANSACTIONS:
+        raise ValueError(f'Number of transactions has to be in range [0-{MAX_TRANSACTIONS}]')
+    fi = FileInteractions(filename)
+    fi.header = pd.DataFrame([['01', 'name', 'surname', 'patronymic', 'address']], columns=fi.header.columns)
+    fi.transactions = fi.cast_transactions(generate_transactions(transactions_count, seed))
+    fi.footer = pd.DataFrame([['03', '', '', 'reserved']], columns=fi.footer.columns)
+    fi.total_counter = transactions_count
+    fi.control_sum = int(fi.transactions['Amount'].sum())
+    with open(filename, 'wb') as f:
+        for df in [fi.header, fi.transactions, fi.calculate_footer()]:
+            for start in range(0, len(df), fi.write_block_size):
+                f.write(fi.format_records(df.iloc[start:start + fi.write_block_size]))
+    return filename
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate valid fixed-width file with random transactions')
+    parser.add_argument('filename')
+    parser.add_argument('transactions_count', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_file(args.filename, args.transactions_count, args.seed)
@@ -0,0 +1,157 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from file_interactions import FileInteractions
+from generate_file import generate_file, generate_transactions
+
+BASELINE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+NOISE_LEVELS = {'seconds': 0.005, 'peak_memory_bytes': 2 ** 20}
+
+
+def loaded(filename: str) -> FileInteractions:
+    fi = FileInteractions(filename)
+    fi.read_file()
+    return fi
+
+
+def new_transactions(transactions_count: int) -> pd.DataFrame:
+    transactions = generate_transactions(transactions_count, seed=1)
+    return pd.DataFrame({'Amount': transactions['Amount'].map(FileInteractions('').cents_to_amount),
+                         'Currency': transactions['Currency'].astype(str),
+                         'Reserved': ''})
+
+
+def warm_cache(filename: str) -> FileInteractions:
+    FileInteractions(filename, use_cache=True).read_file()
+    return FileInteractions(filename, use_cache=True)
+
+
+# Every scenario is (setup, timed run, number of records processed by one run), setup is not measured
+SCENARIOS = {
+    'load': (lambda filename, count: FileInteractions(filename),
+             lambda fi: fi.read_file(),
+             lambda count: count),
+    'load_cached': (lambda filename, count: warm_cache(filename),
+                    lambda fi: fi.read_file(),
+                    lambda count: count),
+    'single_edit': (lambda filename, count: loaded(filename),
+                    lambda fi: fi.change_field_value(2, '123.45', fi.transactions.iloc[len(fi.transactions) // 2]),
+                    lambda count: 1),
+    'append': (lambda filename, count: loaded(filename),
+               lambda fi: fi.add_new_transaction({'Amount': '10.5', 'Currency': 'EUR', 'Reserved': ''}),
+               lambda count: 1),
+    'full_rewrite': (lambda filename, count: loaded(filename),
+                     lambda fi: fi.write_to_file(),
+                     lambda count: count),
+    'validation': (lambda filename, count: (loaded(filename), new_transactions(count)),
+                   lambda setup: setup[0].validate_new_transactions(setup[1]),
+                   lambda count: count),
+    'verify': (lambda filename, count: FileInteractions(filename),
+               lambda fi: fi.verify_file(),
+               lambda count: count),
+}
+
+
+def run_scenario(name: str, filename: str, transactions_count: int, repeats: int) -> dict:
+    setup, run, records = SCENARIOS[name]
+    work_filename = f'{filename}.{name}'
+    durations = []
+    for _ in range(repeats):
+        shutil.copy(filename, work_filename)
+        state = setup(work_filename, transactions_count)
+        start = time.perf_counter()
+        run(state)
+        durations.append(time.perf_counter() - start)
+    # Memory is traced in a separate run, tracing slows allocations down and would distort timings
+    shutil.copy(filename, work_filename)
+    state = setup(work_filename, transactions_count)
+    tracemalloc.start()
+    run(state)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    shutil.rmtree(f'{os.path.dirname(work_filename)}/.{os.path.basename(work_filename)}.cache', ignore_errors=True)
+    os.remove(work_filename)
+    seconds = min(durations)
+    return {'seconds': seconds,
+            'records_per_second': records(transactions_count) / seconds if seconds else None,
+            'peak_memory_bytes': peak_memory}
+
+
+def run_benchmarks(sizes: list[int], scenarios: list[str], repeats: int, data_directory: str) -> dict:
+    results = {}
+    for transactions_count in sizes:
+        filename = os.path.join(data_directory, f'transactions_{transactions_count}.txt')
+        if not os.path.exists(filename):
+            generate_file(filename, transactions_count)
+        for name in scenarios:
+            key = f'{name}/{transactions_count}'
+            results[key] = run_scenario(name, filename, transactions_count, repeats)
+            print(f'{key:<28}{results[key]["seconds"]:>10.4f} s{results[key]["peak_memory_bytes"] / 2 ** 20:>10.1f} MiB')
+    return {'environment': {'python': platform.python_version(),
+                            'pandas': pd.__version__,
+                            'numpy': np.__version__,
+                            'machine': platform.machine(),
+                            'cpu_count': os.cpu_count()},
+            'results': results}
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    # Scenario regresses when it is slower or needs more memory than baseline by more than tolerance, differences
+    # smaller than noise of a single measurement are ignored
+    regressions = []
+    for key, result in results['results'].items():
+        expected = baseline['results'].get(key)
+        if expected is None:
+            continue
+        for metric in ('seconds', 'peak_memory_bytes'):
+            if result[metric] > expected[metric] * (1 + tolerance) + NOISE_LEVELS[metric]:
+                regressions.append(f'{key} {metric}: {result[metric]:.4g}, baseline {expected[metric]:.4g} '
+                                   f'({result[metric] / expected[metric] - 1:+.0%})')
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark hot paths of FileInteractions on generated files')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='Numbers of transactions in generated files, at most 999999 fit into Counter field')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--data-directory', help='Keep generated files here between runs, temporary by default')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', default=BASELINE_FILENAME)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown, 0.25 means 25 percent')
+    parser.add_argument('--save-baseline', action='store_true', help='Store results as new baseline')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        data_directory = args.data_directory or temp_directory
+        os.makedirs(data_directory, exist_ok=True)
+        results = run_benchmarks(args.sizes, args.scenarios, args.repeats, data_directory)
+
+    for filename in filter(None, [args.output, args.baseline if args.save_baseline else None]):
+        with open(filename, 'w') as f:
+            json.dump(results, f, indent=4)
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, 'r') as f:
+        regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f'Regression: {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+from file_interactions import FileInteractions
+from integrity import IntegrityVerifier
+
+FOOTER_FIELDS = ('Total Counter', 'Control Sum')
+
+
+def batch_filenames(path: str) -> list[str]:
+    # Directory means all files directly in it, anything else is a glob pattern
+    if os.path.isdir(path):
+        filenames = [os.path.join(path, name) for name in os.listdir(path) if not name.startswith('.')]
+    else:
+        filenames = glob.glob(path)
+    return sorted(filename for filename in filenames if os.path.isfile(filename))
+
+
+def process_file(filename: str) -> dict:
+    # Runs in worker process, only this small report is sent back, never parsed records
+    verifier = IntegrityVerifier(FileInteractions(filename))
+    try:
+        errors = verifier.verify()
+    except Exception as e:
+        return {'file': filename, 'failure': f'{type(e).__name__}: {e}'}
+    return {'file': filename,
+            'transactions': verifier.transactions_count,
+            'currencies': verifier.currency_totals,
+            'errors': len(errors),
+            'footer_mismatches': [error['error'] for error in errors if error['field'] in FOOTER_FIELDS],
+            'first_errors': errors[:10]}
+
+
+def process_files(filenames: list[str], processes: int = None) -> Iterator[dict]:
+    # Reports are yielded in order of filenames as soon as they are ready, one file per task, so slow files
+    # do not hold up other processes
+    processes = min(processes or os.cpu_count(), len(filenames))
+    if processes <= 1:
+        yield from map(process_file, filenames)
+        return
+    with ProcessPoolExecutor(processes) as executor:
+        yield from executor.map(process_file, filenames)
+
+
+class BatchTotals:
+    def __init__(self):
+        self.files = 0
+        self.failed_files = []
+        self.files_with_errors = []
+        self.footer_mismatches = []
+        self.transactions = 0
+        self.currencies = {}
+
+    def add(self, report: dict):
+        self.files += 1
+        if 'failure' in report:
+            self.failed_files.append(report['file'])
+            return
+        self.transactions += report['transactions']
+        for currency, totals in report['currencies'].items():
+            currency_totals = self.currencies.setdefault(currency, {'Count': 0, 'Amount': 0})
+            currency_totals['Count'] += totals['Count']
+            currency_totals['Amount'] += totals['Amount']
+        if report['errors']:
+            self.files_with_errors.append(report['file'])
+        if report['footer_mismatches']:
+            self.footer_mismatches.append(report['file'])
+
+    def add_all(self, reports: Iterable[dict]) -> 'BatchTotals':
+        for report in reports:
+            self.add(report)
+        return self
+
+    def to_dict(self) -> dict:
+        return {'files': self.files, 'failed_files': self.failed_files, 'files_with_errors': self.files_with_errors,
+                'footer_mismatches': self.footer_mismatches, 'transactions': self.transactions,
+                'currencies': {currency: dict(self.currencies[currency]) for currency in sorted(self.currencies)}}
@@ -0,0 +1,63 @@
+import zlib
+from typing import Union
+
+from record_store import RecordStore
+
+
+class BlockChecksums:
+    # CRC of every block of block_size transaction records, comparing checksums of two versions of a file tells
+    # which records have to be parsed again. CRC is not meant to resist deliberate collisions, only to be fast.
+    def __init__(self, record_store: RecordStore, block_size: int = 4096):
+        self.block_size = block_size
+        self.header_size = record_store.header_size
+        self.record_size = record_store.record_size
+        self.transactions_count = record_store.transactions_count
+        self.checksums = []
+        with memoryview(record_store.mmap) as view:
+            for start in range(0, self.transactions_count, block_size):
+                stop = min(start + block_size, self.transactions_count)
+                self.checksums.append(zlib.crc32(view[record_store.record_offset(start):record_store.record_offset(stop)]))
+
+    def has_layout(self, record_store: RecordStore) -> bool:
+        return (record_store.header_size, record_store.record_size) == (self.header_size, self.record_size)
+
+    def update(self, record_store: RecordStore, changed_ranges: list[tuple[int, int]]) -> 'BlockChecksums':
+        # Checksums of blocks with changed or appended records only, layout of record_store has to stay the same
+        changed_blocks = {block for start, stop in changed_ranges
+                          for block in range(start // self.block_size, (stop - 1) // self.block_size + 1)}
+        # Last block of previous version gets appended records
+        if record_store.transactions_count > self.transactions_count and self.transactions_count % self.block_size:
+            changed_blocks.add(self.transactions_count // self.block_size)
+        self.transactions_count = record_store.transactions_count
+        blocks_count = -(-self.transactions_count // self.block_size)
+        self.checksums.extend([0] * (blocks_count - len(self.checksums)))
+        with memoryview(record_store.mmap) as view:
+            for block in sorted(changed_blocks | set(range(len(self.checksums), blocks_count))):
+                if block >= blocks_count:
+                    continue
+                start, stop = self.block_range(block)
+                self.checksums[block] = zlib.crc32(view[record_store.record_offset(start):record_store.record_offset(stop)])
+        return self
+
+    def block_range(self, block: int) -> tuple[int, int]:
+        return block * self.block_size, min((block + 1) * self.block_size, self.transactions_count)
+
+    def changed_ranges(self, current: 'BlockChecksums') -> Union[list[tuple[int, int]], None]:
+        # Ranges of transactions in current version which differ from this one, neighbouring ranges are merged.
+        # None means that records were moved or removed, so the whole file has to be parsed again.
+        if (current.block_size, current.header_size, current.record_size) != \
+                (self.block_size, self.header_size, self.record_size) or \
+                current.transactions_count < self.transactions_count:
+            return None
+        ranges = []
+        for block, checksum in enumerate(current.checksums):
+            # Last block of this version is shorter when records were appended, its checksum differs as well
+            if block < len(self.checksums) and self.checksums[block] == checksum and \
+                    self.block_range(block) == current.block_range(block):
+                continue
+            start, stop = current.block_range(block)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Union
+
+
+class ChangeLog:
+    # Ranges of transactions written in place by every patch, appended as JSON lines next to the file, so processes
+    # tracking changes parse them again without checksumming whole file. Writers log only while the log exists,
+    # it is created by the first process which tracks changes, started anew by every full rewrite and whenever
+    # it grows past max_size, and removed by interactive mode or session server when they release the file.
+    def __init__(self, filename: str, max_size: int = 1024 * 1024):
+        directory, basename = os.path.split(os.path.abspath(filename))
+        self.log_filename = os.path.join(directory, f'.{basename}.changes')
+        self.max_size = max_size
+
+    def position(self) -> Union[tuple[int, int], None]:
+        # Inode tells apart log started anew, size is the offset of next entry
+        try:
+            stat = os.stat(self.log_filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def start(self) -> Union[tuple[int, int], None]:
+        try:
+            open(self.log_filename, 'a').close()
+        except OSError:
+            return None
+        return self.position()
+
+    def append(self, before: tuple, after: tuple, changed_ranges: list[tuple[int, int]]):
+        position = self.position()
+        if position is None:
+            return
+        if position[1] >= self.max_size:
+            # Readers find their position in old log invalid and compare checksums of all blocks once
+            self.restart()
+        # Whole entry goes to file in one append, so entries of several writers are not mixed
+        with open(self.log_filename, 'a') as f:
+            f.write(json.dumps({'before': before, 'after': after, 'ranges': changed_ranges}) + '\n')
+
+    def restart(self):
+        # Log is replaced, not truncated, so readers see by inode that their position is not valid any more
+        if not os.path.exists(self.log_filename):
+            return
+        fd, temp_filename = tempfile.mkstemp(prefix=f'{os.path.basename(self.log_filename)}.',
+                                             dir=os.path.dirname(self.log_filename))
+        os.close(fd)
+        try:
+            # Writers running as other users have to be able to append to new log as well
+            shutil.copymode(self.log_filename, temp_filename)
+            os.replace(temp_filename, self.log_filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+
+    def remove(self):
+        try:
+            os.remove(self.log_filename)
+        except FileNotFoundError:
+            pass
+
+    def read(self, position: tuple[int, int]) -> Union[list[tuple[dict, tuple[int, int]]], None]:
+        # Entries written since position, each with position right after it, None when log was started anew
+        # or removed
+        current = self.position()
+        if position is None or current is None or current[0] != position[0] or current[1] < position[1]:
+            return None
+        with open(self.log_filename, 'rb') as f:
+            f.seek(position[1])
+            data = f.read(current[1] - position[1])
+        entries = []
+        offset = position[1]
+        # Entry which is being appended right now is left for the next read
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            entries.append((json.loads(line), (position[0], offset)))
+        return entries
+
+    def changed_ranges(self, position: tuple[int, int], synced_signature: tuple,
+                       signature: tuple) -> tuple[Union[list[tuple[int, int]], None], Union[tuple[int, int], None]]:
+        # Merged ranges changed from synced_signature to signature and position of the next entry, ranges are None
+        # when the log does not tell all of the changes
+        entries = self.read(position)
+        if entries is None:
+            return None, self.position()
+        synced_signature, signature = tuple(synced_signature), tuple(signature)
+        current = synced_signature
+        changed_ranges = []
+        for entry, entry_position in entries:
+            if tuple(entry['before']) == current:
+                changed_ranges.extend(tuple(changed_range) for changed_range in entry['ranges'])
+                current = tuple(entry['after'])
+                if current == signature:
+                    return merge_ranges(changed_ranges), entry_position
+            elif current != synced_signature:
+                break
+            # Entries before the synced version, like the ones of own writes, are skipped
+        return None, entries[-1][1] if entries else position
+
+
+def merge_ranges(changed_ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged = []
+    for start, stop in sorted(changed_ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
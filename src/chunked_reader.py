@@ -0,0 +1,43 @@
+import pandas as pd
+from itertools import islice
+
+
+class ChunkedReader:
+    # Transactions are yielded in chunks of at most chunk_size rows, so only one chunk is held in memory at a time.
+    # Header is available once iteration starts, footer and totals once it is finished.
+    def __init__(self, file_interactions, chunk_size: int = 100000):
+        self.file_interactions = file_interactions
+        self.chunk_size = chunk_size
+        self.header = None
+        self.footer = None
+        self.total_counter = 0
+        self.control_sum = 0
+
+    def __iter__(self):
+        self.total_counter = 0
+        self.control_sum = 0
+        with open(self.file_interactions.filename, 'rb') as f:
+            self.header = self.file_interactions.parse_header(f.readline())
+            # One line more than chunk is read, because the last line in file is footer and not a transaction
+            lines = list(islice(f, self.chunk_size + 1))
+            while len(lines) > self.chunk_size:
+                yield self.parse_chunk(lines[:self.chunk_size])
+                lines = lines[self.chunk_size:] + list(islice(f, self.chunk_size))
+            self.footer = self.file_interactions.parse_footer(lines.pop() if lines else b'')
+            if lines:
+                yield self.parse_chunk(lines)
+
+    def parse_chunk(self, lines: list[bytes]) -> pd.DataFrame:
+        chunk = self.file_interactions.parse_transactions(b''.join(lines))
+        chunk.index = pd.RangeIndex(self.total_counter, self.total_counter + len(chunk))
+        self.total_counter += len(chunk)
+        self.control_sum += int(chunk['Amount'].sum())
+        return chunk
+
+    def footer_mismatches(self) -> dict[str, tuple[str, int]]:
+        mismatches = {}
+        for column, calculated in (('Total Counter', self.total_counter), ('Control Sum', self.control_sum)):
+            value = self.footer[column].iloc[0]
+            if not value.isdigit() or int(value) != calculated:
+                mismatches[column] = (value, calculated)
+        return mismatches
@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+from typing import TYPE_CHECKING, Union
+
+from colored_logger import logger
+from file_lock import FileLock
+from quick_reader import QuickReader, format_record, format_table
+from session_client import default_socket_path, send_request
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from file_interactions import FileInteractions
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='CLI tool for fixed-width transaction files. '
+                                                 'Without a command interactive menu is started.')
+    parser.add_argument('--file', default='task_data.txt', help='Fixed-width file to work with')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='Send get, set, add and query commands to session server listening on this socket')
+    parser.add_argument('--parse-processes', type=int, default=1, metavar='N',
+                        help='Parse transactions of large file in N processes, 0 means one per core')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='Show only messages of this level or higher (or set FIXED_WIDTH_LOG_LEVEL)')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Write timings and counters of hot paths as JSON at exit, - for standard error '
+                             '(or set FIXED_WIDTH_METRICS)')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='Profile whole run with cProfile and store stats in pstats format (or set FIXED_WIDTH_PROFILE)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Add peak memory and top allocations to metrics (or set FIXED_WIDTH_TRACE_MEMORY=1)')
+    commands = parser.add_subparsers(dest='command')
+
+    get_parser = commands.add_parser('get', help='Print header, footer or one transaction')
+    get_parser.add_argument('record', choices=['header', 'footer', 'transaction'])
+    get_parser.add_argument('index', nargs='?', type=int, help='Transaction index')
+    get_parser.add_argument('--field', help='Print only value of this field')
+
+    set_parser = commands.add_parser('set', help='Change value of one field')
+    set_parser.add_argument('record', choices=['header', 'footer', 'transaction'])
+    set_parser.add_argument('arguments', nargs='+', metavar='[INDEX] FIELD VALUE')
+
+    add_parser = commands.add_parser('add', help='Add one transaction')
+    add_parser.add_argument('amount')
+    add_parser.add_argument('currency')
+    add_parser.add_argument('reserved', nargs='?', default='')
+
+    import_parser = commands.add_parser('import', help='Add all transactions from CSV or fixed-width file at once')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--format', choices=['csv', 'fixed-width'],
+                               help='Format of imported file, by default .csv files are read as CSV')
+
+    query_parser = commands.add_parser('query', help='Find transactions by currency, amount and counter ranges')
+    query_parser.add_argument('--currency')
+    query_parser.add_argument('--min-amount')
+    query_parser.add_argument('--max-amount')
+    query_parser.add_argument('--min-counter', type=int)
+    query_parser.add_argument('--max-counter', type=int)
+    query_parser.add_argument('--limit', type=int, help='Print at most this many transactions')
+    query_parser.add_argument('--summary', action='store_true', help='Print only count and sum per currency')
+
+    serve_parser = commands.add_parser('serve', help='Keep file loaded and serve commands of many clients, '
+                                                     'by default on .<file name>.sock next to the file')
+    serve_parser.add_argument('--flush-delay', type=float, default=0.05,
+                              help='Seconds to wait for more changes before they are written together')
+
+    batch_parser = commands.add_parser('batch', help='Verify many files at once and sum their transactions '
+                                                     'per currency, --file is ignored')
+    batch_parser.add_argument('path', help='Directory or glob pattern, quote it so shell does not expand it')
+    batch_parser.add_argument('--processes', type=int, help='Number of worker processes, one per core by default')
+    batch_parser.add_argument('--json', action='store_true',
+                              help='Print report of every file and final totals as JSON lines')
+    return parser
+
+
+def print_record(record: dict[str, str], field: str) -> int:
+    if field is None:
+        print(format_record(record))
+    elif field in record:
+        print(record[field])
+    else:
+        logger.error('Field "%s" does not exist, available fields: %s', field, list(record))
+        return 1
+    return 0
+
+
+def quick_get_command(args: argparse.Namespace) -> Union[int, None]:
+    # Fixed-width files are answered without pandas, None means that file has to be parsed by FileInteractions
+    try:
+        with QuickReader(args.file) as quick_reader:
+            if args.record == 'header':
+                record = quick_reader.get_header()
+            elif args.record == 'footer':
+                record = quick_reader.get_footer()
+            else:
+                if args.index is None or not 0 <= args.index < quick_reader.count_transactions():
+                    logger.error('Transaction index has to be in range [0-%s]', quick_reader.count_transactions() - 1)
+                    return 1
+                record = quick_reader.get_transaction(args.index)
+    except FileNotFoundError:
+        logger.error('Check if file path is correct %s', args.file)
+        return 1
+    except Exception:
+        return None
+    return print_record(record, args.field)
+
+
+def get_command(file_interactions: 'FileInteractions', args: argparse.Namespace) -> int:
+    if not file_interactions.read_file():
+        return 1
+    if args.record == 'header':
+        record = file_interactions.header.iloc[0]
+    elif args.record == 'footer':
+        record = file_interactions.footer.iloc[0]
+    else:
+        if args.index is None or not 0 <= args.index < len(file_interactions.transactions):
+            logger.error('Transaction index has to be in range [0-%s]', len(file_interactions.transactions) - 1)
+            return 1
+        record = file_interactions.to_display(file_interactions.transactions.iloc[args.index])
+    return print_record({name: str(value) for name, value in record.items()}, args.field)
+
+
+def split_set_arguments(args: argparse.Namespace) -> Union[tuple, None]:
+    expected_arguments = 3 if args.record == 'transaction' else 2
+    if len(args.arguments) != expected_arguments:
+        logger.error('Expected %s arguments', 'INDEX FIELD VALUE' if expected_arguments == 3 else 'FIELD VALUE')
+        return None
+    return tuple(args.arguments) if expected_arguments == 3 else (None, *args.arguments)
+
+
+def set_command(file_interactions: 'FileInteractions', args: argparse.Namespace) -> int:
+    set_arguments = split_set_arguments(args)
+    if set_arguments is None or not file_interactions.read_file():
+        return 1
+    index, field_name, value = set_arguments
+    if args.record == 'transaction':
+        if not index.isdigit() or int(index) >= len(file_interactions.transactions):
+            logger.error('Transaction index has to be in range [0-%s]', len(file_interactions.transactions) - 1)
+            return 1
+        record = file_interactions.transactions.iloc[int(index)]
+    else:
+        record = getattr(file_interactions, args.record).iloc[0]
+    if field_name not in record.index:
+        logger.error('Field "%s" does not exist, available fields: %s', field_name, list(record.index))
+        return 1
+    return 0 if file_interactions.change_field_value(record.index.get_loc(field_name), value, record) else 1
+
+
+def add_command(file_interactions: 'FileInteractions', args: argparse.Namespace) -> int:
+    if not file_interactions.read_file():
+        return 1
+    values_dict = {'Amount': args.amount, 'Currency': args.currency, 'Reserved': args.reserved}
+    result = file_interactions.add_new_transaction(values_dict)
+    return 0 if result and result != -1 else 1
+
+
+def read_transactions_to_import(args: argparse.Namespace) -> 'pd.DataFrame':
+    file_format = args.format or ('csv' if os.path.splitext(args.path)[1].lower() == '.csv' else 'fixed-width')
+    if file_format == 'csv':
+        import pandas as pd
+        return pd.read_csv(args.path, dtype=str, keep_default_na=False)
+    from file_interactions import FileInteractions
+
+    imported = FileInteractions(args.path, parse_processes=args.parse_processes or None)
+    if not imported.read_file():
+        return None
+    transactions = imported.transactions[['Amount', 'Currency', 'Reserved']]
+    return transactions.assign(Amount=transactions['Amount'].map(imported.cents_to_amount))
+
+
+def import_command(file_interactions: 'FileInteractions', args: argparse.Namespace) -> int:
+    try:
+        transactions = read_transactions_to_import(args)
+    except Exception as e:
+        logger.error('Transactions could not be read from %s: %s', args.path, e)
+        return 1
+    if transactions is None or not file_interactions.read_file():
+        return 1
+    result = file_interactions.add_new_transactions(transactions)
+    if not result or result == -1:
+        return 1
+    logger.info('%s transactions imported', len(transactions))
+    return 0
+
+
+def query_command(file_interactions: 'FileInteractions', args: argparse.Namespace) -> int:
+    amounts = {}
+    for name, amount in (('min_amount', args.min_amount), ('max_amount', args.max_amount)):
+        if amount is not None:
+            amounts[name] = file_interactions.run_validators('Amount', amount)
+            if amounts[name] is False:
+                return 1
+    if not file_interactions.read_file():
+        return 1
+    transactions, summary = file_interactions.query_transactions(args.currency, min_counter=args.min_counter,
+                                                                 max_counter=args.max_counter, **amounts)
+    if not args.summary:
+        print(file_interactions.to_display(transactions.head(args.limit) if args.limit else transactions).to_string())
+    print(file_interactions.to_display(summary).to_string())
+    return 0
+
+
+def remote_request(args: argparse.Namespace) -> Union[dict, None]:
+    if args.command == 'get':
+        return {'command': 'get', 'record': args.record, 'index': args.index, 'field': args.field}
+    elif args.command == 'set':
+        set_arguments = split_set_arguments(args)
+        if set_arguments is None:
+            return None
+        index, field_name, value = set_arguments
+        return {'command': 'set', 'record': args.record, 'index': int(index) if index and index.isdigit() else index,
+                'field': field_name, 'value': value}
+    elif args.command == 'add':
+        return {'command': 'add', 'amount': args.amount, 'currency': args.currency, 'reserved': args.reserved}
+    elif args.command == 'query':
+        return {'command': 'query', 'currency': args.currency, 'min_amount': args.min_amount,
+                'max_amount': args.max_amount, 'min_counter': args.min_counter, 'max_counter': args.max_counter,
+                'limit': args.limit}
+    logger.error('Command "%s" can not be sent to session server', args.command)
+    return None
+
+
+def remote_command(args: argparse.Namespace, socket_path: str) -> int:
+    # Command is executed by session server, this process does not need to read the file nor import pandas
+    request = remote_request(args)
+    if request is None:
+        return 1
+    try:
+        response = send_request(socket_path, request)
+    except OSError as e:
+        logger.error('Session server is not available on %s: %s', socket_path, e)
+        return 1
+    if not response['ok']:
+        logger.error(response['error'])
+        return 1
+    result = response['result']
+    if args.command == 'get':
+        if isinstance(result, dict):
+            print(format_record(result))
+        else:
+            print(result)
+    elif args.command == 'query':
+        if not args.summary:
+            print(format_table(result['columns'], result['transactions']))
+        print(format_table(['Currency', 'Count', 'Amount'],
+                           [[currency, str(row['Count']), row['Amount']] for currency, row in result['summary'].items()]))
+    return 0
+
+
+def batch_command(args: argparse.Namespace) -> int:
+    from batch_processor import BatchTotals, batch_filenames, process_files
+    from file_interactions import FileInteractions
+
+    filenames = batch_filenames(args.path)
+    if not filenames:
+        logger.error('No files found in %s', args.path)
+        return 1
+    # Every report is printed as soon as its file is done, only totals are kept
+    totals = BatchTotals()
+    for report in process_files(filenames, args.processes):
+        totals.add(report)
+        if args.json:
+            print(json.dumps(report), flush=True)
+        elif 'failure' in report:
+            print(f'{report["file"]}: can not be processed, {report["failure"]}', flush=True)
+        else:
+            problems = '; '.join(report['footer_mismatches'])
+            print(f'{report["file"]}: {report["transactions"]} transactions, {report["errors"]} errors'
+                  f'{", " + problems if problems else ""}', flush=True)
+    if args.json:
+        print(json.dumps({'totals': totals.to_dict()}))
+    else:
+        cents_to_amount = FileInteractions('').cents_to_amount
+        print(format_table(['Currency', 'Count', 'Amount'],
+                           [[currency, str(currency_totals['Count']), cents_to_amount(currency_totals['Amount'])]
+                            for currency, currency_totals in totals.to_dict()['currencies'].items()]))
+        print(f'{totals.files} files, {totals.transactions} transactions, '
+              f'{len(totals.files_with_errors)} files with errors, '
+              f'{len(totals.footer_mismatches)} with footer mismatch, {len(totals.failed_files)} not processed')
+    return 1 if totals.files_with_errors or totals.failed_files else 0
+
+
+commands = {'get': get_command, 'set': set_command, 'add': add_command, 'import': import_command,
+            'query': query_command}
+quick_commands = {'get': quick_get_command}
+writing_commands = {'set', 'add', 'import'}
+
+
+def run_command(args: argparse.Namespace) -> int:
+    if args.command == 'serve':
+        from session_server import run_server
+
+        return run_server(args.file, args.socket, args.flush_delay, args.parse_processes or None)
+    if args.command == 'batch':
+        return batch_command(args)
+    if args.socket:
+        return remote_command(args, args.socket)
+    if args.command in quick_commands:
+        result = quick_commands[args.command](args)
+        if result is not None:
+            return result
+
+    # Writes are allowed only while no session server or other writer holds the file, changes are then sent
+    # to the server instead, so they are not overwritten by it
+    file_lock = FileLock(args.file)
+    if args.command in writing_commands and os.path.exists(args.file) and not file_lock.acquire():
+        if args.command != 'import' and os.path.exists(default_socket_path(args.file)):
+            return remote_command(args, default_socket_path(args.file))
+        logger.error('File %s is locked by another process, lock file %s', args.file, file_lock.lock_filename)
+        return 1
+    # Pandas is imported only by commands which work with whole table
+    from file_interactions import FileInteractions
+
+    file_interactions = FileInteractions(args.file, use_cache=True, parse_processes=args.parse_processes or None)
+    try:
+        return commands[args.command](file_interactions, args)
+    finally:
+        file_interactions.close_records()
+        file_lock.release()
@@ -2,13 +2,21 @@ import logging
 import pandas as pd
 from typing import Any, Union
 
+import colored_logger
 from colored_logger import logger
 from file_interactions import FileInteractions
+from transaction_pager import TransactionPager
+
+
+def ask_user(text: str) -> str:
+    # Log records are written by listener thread, errors of previous answer are shown before the next question
+    colored_logger.flush()
+    return input(text)
 
 
 def input_interaction_handler(input_text: str, success_thresholds, return_option: Any=-1, cast_function=str) -> Union[int, str]:
     try:
-        input_answer = input(input_text)
+        input_answer = ask_user(input_text)
         if not input_answer:
             return input_interaction_handler(input_text, success_thresholds, return_option, cast_function)
         casted_input_answer = cast_function(input_answer)
@@ -18,43 +26,10 @@ def input_interaction_handler(input_text: str, success_thresholds, return_option
             raise Exception(f'Please enter right value in {success_thresholds}')
         return casted_input_answer
     except Exception as e:
-        logger.error(f'{e}')
+        logger.error('%s', e)
     return 'error'
 
 
-def create_help_text_for_transactions(text: str, transactions: list, step: int = 1) -> tuple[str, list]:
-    split_transactions = []
-    transactions_range_choice = 0
-    counter = -1
-    input_text = f'{counter}. Return\n'
-
-    for i in range(0, len(transactions), step):
-        counter += 1
-        split_transactions.append(transactions[i:i+step])
-        input_text += text.format(counter=counter, start=i, stop=i+step)
-
-    return input_text, split_transactions
-
-
-def transactions_input(input_text: str, transactions_range_len: int) -> int:
-    transactions_range_choice = input_interaction_handler(input_text, range(-1, transactions_range_len),
-                                                          return_option=-1, cast_function=int)
-    if transactions_range_choice == 'error':
-        return transactions_input(input_text, transactions_range_len)
-    return transactions_range_choice
-
-
-def get_index_from_transactions_chunk(input_text: str, transactions_range_indexes: pd.RangeIndex, chunk_size: int) -> int:
-    one_transaction_choice = input_interaction_handler(input_text, transactions_range_indexes,
-                                                       return_option=-1, cast_function=int)
-    if one_transaction_choice == 'error':
-        return get_index_from_transactions_chunk(input_text, transactions_range_indexes, chunk_size)
-    elif one_transaction_choice == 'return':
-        return one_transaction_choice
-    index_within_chunk = one_transaction_choice % chunk_size
-    return index_within_chunk
-
-
 def change_values_in_header_or_footer(file_interactions: FileInteractions, header_or_footer: pd.DataFrame) -> int:
     input_text = f'You are about to change following line:\n' \
                  f'{header_or_footer}\n\n' \
@@ -69,65 +44,67 @@ def change_values_in_header_or_footer(file_interactions: FileInteractions, heade
     if field_choice == 'return':
         return ''
 
-    field_value = input(f'Please enter value for {header_or_footer_row.index[field_choice]}:\n'
-                        f'Type return to return\n')
+    field_value = ask_user(f'Please enter value for {header_or_footer_row.index[field_choice]}:\n'
+                           f'Type return to return\n')
     if field_value == 'return' or not file_interactions.change_field_value(field_choice, field_value, header_or_footer_row):
         return change_values_in_header_or_footer(file_interactions, header_or_footer)
 
     return field_value
 
 
-def interactions_with_transactions(file_interactions: FileInteractions, transactions: pd.DataFrame, choice: int = 1) -> str:
-    # Split every 200 transaction to make choice output more human readable
-    chunk_size = 200
-    input_text, transactions_range = create_help_text_for_transactions('{counter}. Display transactions from {start} to {stop}\n',
-                                                                       transactions, step=chunk_size)
-
-    transactions_range_choice = transactions_input(input_text, len(transactions_range))
-    if transactions_range_choice == 'return':
-        return ''
-    print(transactions_range[transactions_range_choice])
-    transactions_range_indexes = transactions_range[transactions_range_choice].index
-
+def select_transaction(file_interactions: FileInteractions, transaction: pd.Series, choice: int) -> Union[str, None]:
+    # Returns None when user goes back to the page
+    print(file_interactions.to_display(transaction))
     if choice == 1:
-        index_within_chunk = get_index_from_transactions_chunk(f'Select one transaction to display by its '
-                                                               f'index (first column)[{transactions_range_indexes[0]}-'
-                                                               f'{transactions_range_indexes[-1]}]:\n-1. Return\n',
-                                                               transactions_range_indexes,
-                                                               chunk_size)
-        if index_within_chunk == 'return':
-            return interactions_with_transactions(file_interactions, transactions, choice)
-        transaction = transactions_range[transactions_range_choice].iloc[index_within_chunk]
-        print(transaction)
-    elif choice == 2:
-        index_within_chunk = get_index_from_transactions_chunk(f'Select transaction which you want to '
-                                                               f'change[{transactions_range_indexes[0]}-'
-                                                               f'{transactions_range_indexes[-1]}]:\n-1. Return\n',
-                                                               transactions_range_indexes,
-                                                               chunk_size)
-        if index_within_chunk == 'return':
-            return interactions_with_transactions(file_interactions, transactions, choice)
-        transaction = transactions_range[transactions_range_choice].iloc[index_within_chunk]
-        print(transaction)
-        transaction_columns = [f'{index}. {column}\n' for index, column in enumerate(transaction.index)]
-        field_input_text = 'Select field which you want to change:\n' \
-                           '-1. Return\n'
-        field_input_text += ''.join(transaction_columns)
-        transaction_field_choice = input_interaction_handler(field_input_text, range(-1, len(transaction.index)),
-                                                             return_option=-1, cast_function=int)
-
-        if transaction_field_choice == 'return':
-            return interactions_with_transactions(file_interactions, transactions, choice)
-
-        transaction_field_value = input(f'Please enter value for {transaction.index[transaction_field_choice]}:\n'
-                                        f'Type return to return\n')
-        if transaction_field_value == 'return' or not file_interactions.change_field_value(transaction_field_choice,
-                                                                                           transaction_field_value,
-                                                                                           transaction):
-            return interactions_with_transactions(file_interactions, transactions, choice)
+        return ''
+    transaction_columns = [f'{index}. {column}\n' for index, column in enumerate(transaction.index)]
+    field_input_text = 'Select field which you want to change:\n' \
+                       '-1. Return\n'
+    field_input_text += ''.join(transaction_columns)
+    transaction_field_choice = input_interaction_handler(field_input_text, range(-1, len(transaction.index)),
+                                                         return_option=-1, cast_function=int)
+    if transaction_field_choice in ('return', 'error'):
+        return None
+
+    transaction_field_value = ask_user(f'Please enter value for {transaction.index[transaction_field_choice]}:\n'
+                                       f'Type return to return\n')
+    if transaction_field_value == 'return' or not file_interactions.change_field_value(transaction_field_choice,
+                                                                                       transaction_field_value,
+                                                                                       transaction):
+        return None
     return ''
 
 
+def interactions_with_transactions(file_interactions: FileInteractions, transactions: pd.DataFrame, choice: int = 1) -> str:
+    # Transactions are shown page by page, only the current page is read from file when it is not loaded
+    pager = TransactionPager(file_interactions, page_size=200)
+    action = 'display' if choice == 1 else 'change'
+    while True:
+        transactions_chunk = pager.current_page()
+        print(file_interactions.to_display(transactions_chunk))
+        start, stop = pager.page_range()
+        user_inp = ask_user(f'{pager.help_text()}'
+                            f'Or select transaction to {action} by its index (first column)[{start}-{stop - 1}]:\n').strip()
+        if user_inp == '-1':
+            return ''
+        elif user_inp == 'n':
+            if not pager.next_page():
+                logger.error('This is the last page')
+        elif user_inp == 'p':
+            if not pager.previous_page():
+                logger.error('This is the first page')
+        elif user_inp.startswith('j'):
+            counter = user_inp[1:].strip()
+            if not counter.isdigit() or pager.jump_to_counter(int(counter)) is None:
+                logger.error('Transaction with Counter "%s" does not exist', counter)
+        elif user_inp.isdigit() and start <= int(user_inp) < stop:
+            result = select_transaction(file_interactions, transactions_chunk.loc[int(user_inp)], choice)
+            if result is not None:
+                return result
+        else:
+            logger.error('Please enter right value, one of -1, n, p, j <counter> or index in [%s-%s]', start, stop - 1)
+
+
 def get_value_interaction(file_interactions, header: pd.DataFrame, footer: pd.DataFrame, transactions: pd.DataFrame) -> int:
     input_text = 'Select field to get values:\n' \
                  '-1. Return\n' \
@@ -150,7 +127,7 @@ def get_value_interaction(file_interactions, header: pd.DataFrame, footer: pd.Da
 def add_new_transaction_interaction(file_interactions: FileInteractions, transactions: pd.DataFrame) -> int:
     values_dict = {}
     for column in transactions.columns[-3:]:
-        values_dict[column] = input(f'Provide value for "{column}":\n')
+        values_dict[column] = ask_user(f'Provide value for "{column}":\n')
     return file_interactions.add_new_transaction(values_dict)
 
 
@@ -160,9 +137,11 @@ def change_values_interaction(file_interactions, header: pd.DataFrame, footer: p
                  '0. Header\n' \
                  '1. Transactions\n' \
                  '2. Footer\n'
+    # All changes made in this menu are written to file once, when user returns from it
+    edit_session = file_interactions.begin_edit_session()
     user_inp = input_interaction_handler(input_text, range(-1, 3), return_option=-1, cast_function=int)
     if user_inp == 'return':
-        return ''
+        return edit_session.commit()
     elif user_inp == 0:
         result = change_values_in_header_or_footer(file_interactions, header)
     elif user_inp == 1:
@@ -172,26 +151,74 @@ def change_values_interaction(file_interactions, header: pd.DataFrame, footer: p
     return change_values_interaction(file_interactions, header, footer, transactions)
 
 
+def query_conditions_input(file_interactions: FileInteractions) -> Union[dict, str]:
+    print('Provide query conditions, leave value empty to skip condition or type return to return')
+    conditions = {}
+    for name, prompt in (('currency', f'Currency {file_interactions.availabe_currencies}'),
+                         ('min_amount', 'Minimal amount'), ('max_amount', 'Maximal amount'),
+                         ('min_counter', 'Minimal counter'), ('max_counter', 'Maximal counter')):
+        value = ask_user(f'{prompt}:\n').strip()
+        if value == 'return':
+            return 'return'
+        if not value:
+            continue
+        if name in ('min_amount', 'max_amount'):
+            value = file_interactions.run_validators('Amount', value)
+        elif name in ('min_counter', 'max_counter'):
+            if not value.isdigit():
+                logger.error('Counter has to be a number, got "%s"', value)
+                return query_conditions_input(file_interactions)
+            value = int(value)
+        if value is False:
+            return query_conditions_input(file_interactions)
+        conditions[name] = value
+    return conditions
+
+
+def query_interaction(file_interactions: FileInteractions) -> str:
+    # Only first chunk of matching transactions is shown, summary covers all of them
+    chunk_size = 200
+    conditions = query_conditions_input(file_interactions)
+    if conditions == 'return':
+        return ''
+    transactions, summary = file_interactions.query_transactions(**conditions)
+    print(file_interactions.to_display(transactions.head(chunk_size)))
+    if len(transactions) > chunk_size:
+        print(f'{len(transactions) - chunk_size} more transactions match')
+    return str(file_interactions.to_display(summary))
+
+
 def user_interaction(file_interactions: FileInteractions, header: pd.DataFrame, footer: pd.DataFrame, transactions: pd.DataFrame) -> int:
     result = ''
-    user_inp = input('Please select number from the menu:\n'
-                     '1. Get the value of specified field\n'
-                     '2. Change field values\n'
-                     '3. Add new transaction\n'
-                     '4. Exit\n')
-
-    if (not user_inp) or (not user_inp.isnumeric()) or (int(user_inp) not in range(1, 5)):
+    user_inp = ask_user('Please select number from the menu:\n'
+                        '1. Get the value of specified field\n'
+                        '2. Change field values\n'
+                        '3. Add new transaction\n'
+                        '4. Query transactions\n'
+                        '5. Exit\n')
+
+    if (not user_inp) or (not user_inp.isnumeric()) or (int(user_inp) not in range(1, 6)):
         logger.error('Please enter a correct number')
         return user_interaction(file_interactions, header, footer, transactions)
 
     user_inp = int(user_inp)
+    # File can be changed by other processes while menu waits for input, their changes are loaded first
+    if file_interactions.sync_with_file():
+        header, footer = file_interactions.get_header(), file_interactions.get_footer()
+        transactions = file_interactions.transactions
     if user_inp == 1:
         result = get_value_interaction(file_interactions, header, footer, transactions)
     elif user_inp == 2:
+        # Changes need whole file parsed, lazily opened file is loaded on first change
+        header, footer, transactions = file_interactions.load()
         result = change_values_interaction(file_interactions, header, footer, transactions)
     elif user_inp == 3:
+        header, footer, transactions = file_interactions.load()
         result = add_new_transaction_interaction(file_interactions, transactions)
     elif user_inp == 4:
+        header, footer, transactions = file_interactions.load()
+        result = query_interaction(file_interactions)
+    elif user_inp == 5:
         exit(0)
     print(f'\n{result}\n' if result else result)
     return user_interaction(file_interactions, header, footer, transactions)
@@ -1,4 +1,10 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+
+LOG_LEVEL_VARIABLE = 'FIXED_WIDTH_LOG_LEVEL'
 
 # Colors in ANSI format(without installing external software) for logging
 RESET = '\033[0m'
@@ -13,13 +19,37 @@ COLORS = {
 class ColoredFormatter(logging.Formatter):
     def __init__(self, fmt, datefmt=None, style='%'):
         super().__init__(fmt, datefmt, style)
+        # One formatter per level is created up front instead of a new one for every record
+        self.level_formatters = {level: logging.Formatter(color + fmt + RESET, datefmt, style)
+                                 for level, color in COLORS.items()}
 
     def format(self, record):
-        log_fmt = COLORS.get(record.levelname, '') + self._fmt + RESET
-        formatter = logging.Formatter(log_fmt)
+        formatter = self.level_formatters.get(record.levelname)
+        if formatter is None:
+            return super().format(record)
         return formatter.format(record)
 
 
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # Record is put on queue as it is, message is formatted in listener thread instead of the calling one
+    def prepare(self, record):
+        return record
+
+
+def log_level_from_environment() -> int:
+    level = logging.getLevelName(os.environ.get(LOG_LEVEL_VARIABLE, 'DEBUG').upper())
+    return level if isinstance(level, int) else logging.DEBUG
+
+
+def set_level(level: str):
+    logging.getLogger().setLevel(level.upper())
+
+
+def flush():
+    # Waits until listener thread writes all records already logged
+    log_queue.join()
+
+
 def setup_logger():
     log_format = '%(levelname)s: %(message)s'
     console_handler = logging.StreamHandler()
@@ -28,9 +58,24 @@ def setup_logger():
     colored_formatter = ColoredFormatter(log_format)
     console_handler.setFormatter(colored_formatter)
 
+    # Callers only put records on queue, formatting and writing to terminal are done by listener thread,
+    # records left on queue are written at exit
+    queue_handler = DeferredQueueHandler(log_queue)
+    listener = logging.handlers.QueueListener(log_queue, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(console_handler)
+    logger.setLevel(log_level_from_environment())
+    logger.addHandler(queue_handler)
+
+    def log_directly_in_child():
+        # Forked process does not have listener thread, so records are written by console handler directly
+        logger.removeHandler(queue_handler)
+        logger.addHandler(console_handler)
+
+    os.register_at_fork(after_in_child=log_directly_in_child)
     return logger
 
+log_queue = queue.Queue()
 logger = setup_logger()
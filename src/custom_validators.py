@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+
+
 def validate_integer(string_to_validate: str) -> bool:
     try:
         if str(string_to_validate).isnumeric() and int(string_to_validate):
@@ -31,3 +35,41 @@ def validate_available_currency(string_to_validate: str, available_currency_list
     if string_to_validate in available_currency_list:
         return True
     return False
+
+
+# Batch counterparts of validators above, whole column is checked at once and boolean mask of valid values is returned
+def validate_integers(values_to_validate: pd.Series) -> pd.Series:
+    strings = values_to_validate.astype(str)
+    numbers = pd.to_numeric(strings.where(strings.str.isnumeric()), errors='coerce')
+    return numbers.notna() & (numbers != 0)
+
+
+def validate_floats(values_to_validate: pd.Series) -> tuple[pd.Series, pd.Series]:
+    # Parsed numbers are returned too, so they do not have to be converted again
+    numbers = pd.to_numeric(values_to_validate.astype(str), errors='coerce')
+    return numbers.notna(), numbers
+
+
+def validate_lengths(values_to_validate: pd.Series, length: int) -> pd.Series:
+    if pd.api.types.is_integer_dtype(values_to_validate.dtype):
+        # Integers are not converted to strings, their length is number of digits and sign
+        values = values_to_validate.to_numpy()
+        digits = np.maximum(np.searchsorted(10 ** np.arange(19, dtype=np.uint64), np.abs(values).astype(np.uint64),
+                                            side='right'), 1)
+        return pd.Series(digits + (values < 0) <= length, index=values_to_validate.index)
+    # Text columns have few distinct values usually, so only lengths of unique values are measured
+    codes, uniques = pd.factorize(values_to_validate.astype(str))
+    return pd.Series((uniques.str.len() <= length)[codes], index=values_to_validate.index)
+
+
+def validate_locked_column_names(columns_to_validate: list, locked_columns_list: list) -> np.ndarray:
+    return ~pd.Index(columns_to_validate).isin(set(locked_columns_list))
+
+
+def validate_available_currencies(values_to_validate: pd.Series, available_currency_list: list) -> pd.Series:
+    available_currencies = set(available_currency_list)
+    if isinstance(values_to_validate.dtype, pd.CategoricalDtype):
+        # Only categories are checked, result is spread to rows by their codes, missing values have code -1
+        is_available = np.append(values_to_validate.cat.categories.isin(available_currencies), False)
+        return pd.Series(is_available[values_to_validate.cat.codes.to_numpy()], index=values_to_validate.index)
+    return values_to_validate.isin(available_currencies)
@@ -0,0 +1,62 @@
+from colored_logger import logger
+
+
+class EditSession:
+    # Field changes and new transactions are applied in memory and remembered, so they can be either
+    # written to file at once on commit or reverted on rollback
+    def __init__(self, file_interactions):
+        self.file_interactions = file_interactions
+        self.changes = []
+        self.transactions_count = len(file_interactions.transactions)
+        self.total_counter = file_interactions.total_counter
+        self.control_sum = file_interactions.control_sum
+
+    def __enter__(self) -> 'EditSession':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def record_change(self, name: str, index, column: str, previous_value):
+        # DataFrame is remembered by its name, transactions are replaced by a new DataFrame when one is added
+        self.changes.append((name, index, column, previous_value))
+
+    def pending_changes_count(self) -> int:
+        return len(self.changes) + len(self.file_interactions.transactions) - self.transactions_count
+
+    def close(self):
+        if self.file_interactions.edit_session is self:
+            self.file_interactions.edit_session = None
+
+    def commit(self) -> int:
+        self.close()
+        if not self.pending_changes_count():
+            return ''
+        return self.end(self.file_interactions.write_to_file())
+
+    def end(self, result: int) -> int:
+        # Result of writing closed session, changes are kept when they were written and reverted otherwise
+        if not result:
+            logger.error('Changes could not be written, all of them are reverted')
+            self.rollback()
+            return result
+        logger.info('%s changes written to file', self.pending_changes_count())
+        self.changes = []
+        self.transactions_count = len(self.file_interactions.transactions)
+        self.total_counter = self.file_interactions.total_counter
+        self.control_sum = self.file_interactions.control_sum
+        return result
+
+    def rollback(self):
+        self.close()
+        for name, index, column, previous_value in reversed(self.changes):
+            getattr(self.file_interactions, name).at[index, column] = previous_value
+        transactions = self.file_interactions.transactions
+        transactions.drop(index=transactions.index[self.transactions_count:], inplace=True)
+        self.file_interactions.total_counter = self.total_counter
+        self.file_interactions.control_sum = self.control_sum
+        self.file_interactions.transaction_index = None
+        self.changes = []
@@ -1,27 +1,66 @@
+import os
+import shutil
+import tempfile
+import zlib
+import numpy as np
 import pandas as pd
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
 from typing import Union
 
 import custom_validators
+import fixed_width
+import instrumentation
+import parallel_reader
+import record_layout
+from block_checksums import BlockChecksums
+from change_log import ChangeLog
+from chunked_reader import ChunkedReader
+from edit_session import EditSession
+from integrity import IntegrityVerifier
+from parsed_cache import ParsedFileCache
 from colored_logger import logger
+from record_store import RecordStore
+from transaction_index import TransactionIndex
 
 
 class FileInteractions:
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, use_cache: bool = False, parse_processes: int = 1, track_changes: bool = False):
         self.filename = filename
-        self.file_lines = []
+        self.use_cache = use_cache
+        # Checksums of loaded file let sync_with_file parse again only records changed by other processes
+        self.track_changes = track_changes
+        self.block_checksums = None
+        self.checksum_block_size = 4096
+        self.signature_tail_size = 512
+        # Position in log of records patched by other processes which is already merged
+        self.change_log_position = None
+        self.change_log_max_size = 1024 * 1024
+        # Number of processes parsing transactions in read_file, None means one per core
+        self.parse_processes = parse_processes
+        self.shard_checks = []
         self.total_counter = 0
+        # Sum of all amounts in cents, kept up to date by every change, so footer does not need to sum all amounts
+        self.control_sum = 0
+        self.is_loaded = False
+        self.record_store = None
+        self.synced_signature = None
+        self.write_block_size = 100000
+        self.edit_session = None
+        # Built on first query and dropped whenever transactions change
+        self.transaction_index = None
         self.max_lengths_dict = {}
-        self.header_positions = (2, 30, 60, 90, 120)
-        self.transaction_positions = (2, 8, 20, 23, 120)
-        self.footer_positions = (2, 8, 20, 120)
-        self.header = pd.DataFrame([], columns=['Field id', 'Name', 'Surname', 'Patronymic', 'Address'])
-        self.transactions = pd.DataFrame([], columns=['Field id', 'Counter', 'Amount', 'Currency', 'Reserved'])
-        self.footer = pd.DataFrame([], columns=['Field id', 'Total Counter', 'Control Sum', 'Reserved'])
+        self.header_positions = record_layout.HEADER_POSITIONS
+        self.transaction_positions = record_layout.TRANSACTION_POSITIONS
+        self.footer_positions = record_layout.FOOTER_POSITIONS
+        self.header = pd.DataFrame([], columns=record_layout.HEADER_COLUMNS)
+        self.transactions = pd.DataFrame([], columns=record_layout.TRANSACTION_COLUMNS)
+        self.footer = pd.DataFrame([], columns=record_layout.FOOTER_COLUMNS)
         self.locked_to_write_access_fields = ['Field id', 'Counter', 'Total Counter', 'Control Sum']
         self.field_fillers = {'Counter': '0', 'Amount': '0', 'Field id': '0', 'Total Counter': '0', 'Control Sum': '0',
                               'Name': ' ', 'Surname': ' ', 'Patronymic': ' ', 'Address': ' ',
                               'Currency': ' ', 'Reserved': ' '}
         self.availabe_currencies= ['USD', 'EUR', 'PLN']
+        self.transactions = self.cast_transactions(self.transactions)
         self.set_lengths_for_fields()
 
     def set_lengths_for_fields(self) -> dict:
@@ -46,26 +85,327 @@ class FileInteractions:
             prev_position = position
         return split_string
 
+    def column_bounds(self, columns: pd.Index, positions: tuple) -> list[tuple[str, int, int]]:
+        return list(zip(columns, (0,) + positions[:-1], positions))
+
+    def parse_header(self, line: bytes) -> pd.DataFrame:
+        return pd.DataFrame([self.split_string_by_positions(line.decode(), self.header_positions)],
+                            columns=self.header.columns)
+
+    def parse_footer(self, line: bytes) -> pd.DataFrame:
+        return pd.DataFrame([self.split_string_by_positions(line.decode(), self.footer_positions)],
+                            columns=self.footer.columns)
+
+    def category_dtype(self, values: pd.Series, known_values: list[str]) -> pd.CategoricalDtype:
+        other_values = sorted(set(pd.unique(values)) - set(known_values))
+        return pd.CategoricalDtype(list(known_values) + other_values)
+
+    @instrumentation.timed('convert')
+    def cast_transactions(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        # Amounts are kept as integer cents, repeated codes as categories, conversion for display is done in CLI
+        return transactions.astype({'Field id': self.category_dtype(transactions['Field id'], ['02']),
+                                    'Counter': 'int32',
+                                    'Amount': 'int64',
+                                    'Currency': self.category_dtype(transactions['Currency'], self.availabe_currencies),
+                                    'Reserved': object})
+
+    @instrumentation.timed('parse.transactions')
+    def parse_transactions(self, block: bytes) -> pd.DataFrame:
+        records = fixed_width.records_as_array(block)
+        instrumentation.count('records_parsed', len(records) if records is not None else block.count(b'\n'))
+        if records is None:
+            return self.parse_transaction_lines(block.decode().splitlines(keepends=True))
+
+        data = {}
+        for column, start, stop in self.column_bounds(self.transactions.columns, self.transaction_positions):
+            if column in ('Counter', 'Amount'):
+                values = fixed_width.slice_int_column(records, start, stop)
+                if values is None:
+                    # Non-digit values, let the per-value conversion report what exactly is wrong
+                    return self.parse_transaction_lines(block.decode().splitlines(keepends=True))
+                data[column] = values
+            else:
+                data[column] = fixed_width.slice_text_column(records, start, stop)
+        return self.cast_transactions(pd.DataFrame(data, columns=self.transactions.columns))
+
+    def parse_transaction_lines(self, lines: list[str]) -> pd.DataFrame:
+        # Column-wise string slicing for records which are not fixed-width in bytes (non-ascii, trimmed lines)
+        lines = pd.Series(lines, dtype=object)
+        data = {}
+        for column, start, stop in self.column_bounds(self.transactions.columns, self.transaction_positions):
+            data[column] = lines.str.slice(start, stop).str.strip()
+        transactions = pd.DataFrame(data, columns=self.transactions.columns).astype(object)
+        transactions['Counter'] = transactions['Counter'].apply(int)
+        transactions['Amount'] = transactions['Amount'].apply(int)
+        return self.cast_transactions(transactions)
+
+    def amount_to_cents(self, amount: Union[str, float]) -> Union[int, None]:
+        try:
+            amount = Decimal(str(amount).strip())
+        except InvalidOperation:
+            return None
+        if not amount.is_finite():
+            return None
+        return int(amount.scaleb(2).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+    def amounts_to_cents(self, amounts: pd.Series, numbers: pd.Series, is_convertible: pd.Series) -> pd.Series:
+        # Scaled floats are rounded the same way as decimals unless they are close to a half cent, such amounts
+        # are converted one by one from their text
+        scaled = numbers.where(is_convertible, 0).mul(100)
+        is_near_half = (scaled - np.floor(scaled) - 0.5).abs() < 0.001
+        cents = scaled.round().astype('int64')
+        cents[is_near_half] = amounts[is_near_half].map(self.amount_to_cents).astype('int64')
+        return cents
+
+    def cents_to_amount(self, cents: int) -> str:
+        return str(Decimal(int(cents)).scaleb(-2))
+
+    def to_display(self, data: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+        # Amounts are shown in currency units, stored values stay in cents
+        if 'Amount' not in data:
+            return data
+        data = data.copy()
+        if isinstance(data, pd.DataFrame):
+            data['Amount'] = data['Amount'].map(self.cents_to_amount)
+        else:
+            data['Amount'] = self.cents_to_amount(data['Amount'])
+        return data
+
     def read_file(self) -> Union[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame], bool]:
         try:
-            with open(self.filename, 'r') as f:
-                self.file_lines = f.readlines()
-            self.header = pd.DataFrame([self.split_string_by_positions(self.file_lines[0], self.header_positions)],
-                                       columns=self.header.columns)
-            self.footer = pd.DataFrame([self.split_string_by_positions(self.file_lines[-1], self.footer_positions)],
-                                       columns=self.footer.columns)
-            self.transactions = pd.DataFrame(list(map(lambda transaction: self.split_string_by_positions(transaction, self.transaction_positions), self.file_lines[1:-1])),
-                                             columns=self.transactions.columns)
-            self.transactions.loc[:, 'Counter'] = self.transactions['Counter'].apply(int)
-            self.transactions.loc[:, 'Amount'] = self.transactions['Amount'].apply(lambda x: int(x)/100)
+            parsed_cache = ParsedFileCache(self.filename) if self.use_cache else None
+            cache_signature = parsed_cache.file_signature() if parsed_cache else None
+            with instrumentation.span('cache.load'):
+                cached = parsed_cache.load(self.transactions.columns) if parsed_cache else None
+            if cached:
+                self.header, self.footer, self.transactions = cached
+            else:
+                if self.parse_processes != 1:
+                    self.header, self.footer, self.transactions = self.parse_file_parallel()
+                else:
+                    self.header, self.footer, self.transactions = self.parse_file()
+                if parsed_cache:
+                    parsed_cache.save(cache_signature, self.header, self.footer, self.transactions)
             self.total_counter = len(self.transactions)
+            self.control_sum = int(self.transactions['Amount'].sum())
+            self.transaction_index = None
+            self.is_loaded = True
+            self.change_log_position = ChangeLog(self.filename).start() if self.track_changes else None
+            self.synced_signature = self.file_signature()
+            self.block_checksums = self.compute_block_checksums() if self.track_changes else None
+            return self.header, self.footer, self.transactions
+        except FileNotFoundError as fnfe:
+            logger.error('Check if file path is correct %s', self.filename)
+        except Exception as e:
+            logger.error('Check if file structure is not corrupted: %s', e)
+        return False
+
+    @instrumentation.timed('parse')
+    def parse_file(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        with open(self.filename, 'rb') as f:
+            header_line, transactions_block, footer_line = fixed_width.split_file_bytes(f.read())
+        return self.parse_header(header_line), self.parse_footer(footer_line), self.parse_transactions(transactions_block)
+
+    @instrumentation.timed('parse')
+    def parse_file_parallel(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        # Fixed-width records let file be split into shards at record boundaries, each parsed in its own process
+        try:
+            record_store = RecordStore(self.filename).open()
+        except ValueError as e:
+            logger.warning('File can not be split into shards, it is parsed in one process: %s', e)
+            return self.parse_file()
+        try:
+            header = self.parse_header(record_store.read_header())
+            footer = self.parse_footer(record_store.read_footer())
+            transactions, self.shard_checks = parallel_reader.parse_transactions_parallel(self, record_store,
+                                                                                         self.parse_processes)
+        finally:
+            record_store.close()
+        parallel_reader.log_shard_checks(self.shard_checks, footer)
+        return header, footer, transactions
+
+    def compute_block_checksums(self) -> Union[BlockChecksums, None]:
+        try:
+            with instrumentation.span('checksums'):
+                record_store = RecordStore(self.filename).open()
+                try:
+                    return BlockChecksums(record_store, self.checksum_block_size)
+                finally:
+                    record_store.close()
+        except (OSError, ValueError) as e:
+            logger.warning('Changes of file can not be tracked by blocks, it will be read whole again: %s', e)
+            return None
+
+    @instrumentation.timed('sync')
+    def sync_with_file(self) -> bool:
+        # Changes made by other processes are merged into loaded DataFrames, only blocks of records which changed
+        # or were appended are parsed again
+        try:
+            signature = self.file_signature()
+        except OSError as e:
+            logger.error('File can not be synchronized: %s', e)
+            return False
+        if signature == self.synced_signature:
+            return True
+        if not self.is_loaded:
+            self.synced_signature = signature
+            self.reopen_records()
+            return True
+        if self.edit_session is not None:
+            logger.warning('File was changed by another process, it is synchronized after edit session ends')
+            return False
+        if self.block_checksums is None:
+            logger.info('File was changed by another process, it is read again')
+            return bool(self.read_file())
+        try:
+            record_store = RecordStore(self.filename).open()
+        except Exception:
+            return bool(self.read_file())
+        try:
+            changed_ranges, block_checksums = self.find_changed_ranges(record_store, signature)
+            if changed_ranges is None or record_store.transactions_count < len(self.transactions):
+                logger.info('Records of file were moved or removed by another process, it is read again')
+                return bool(self.read_file())
+            header = self.parse_header(record_store.read_header())
+            footer = self.parse_footer(record_store.read_footer())
+            synced_count = self.merge_transactions(record_store, changed_ranges)
+        except Exception as e:
+            # Loaded transactions can be merged only partly, so they are not compared by blocks any more
+            self.block_checksums = None
+            logger.error('Check if file structure is not corrupted: %s', e)
+            return False
+        finally:
+            record_store.close()
+        self.header, self.footer = header, footer
+        self.total_counter = len(self.transactions)
+        self.transaction_index = None
+        # Signature taken before reading, so changes made in the meantime are found by the next call
+        self.synced_signature = signature
+        self.block_checksums = block_checksums
+        instrumentation.count('records_synced', synced_count)
+        logger.info('File was changed by another process, %s transactions loaded again', synced_count)
+        self.reopen_records()
+        return True
+
+    def find_changed_ranges(self, record_store: RecordStore,
+                            signature: tuple) -> tuple[Union[list[tuple[int, int]], None], BlockChecksums]:
+        # Ranges logged by writers which patched file are used when they lead exactly to signature, otherwise
+        # checksums of all blocks are compared
+        changed_ranges, self.change_log_position = ChangeLog(self.filename).changed_ranges(
+            self.change_log_position, self.synced_signature, signature)
+        if changed_ranges is not None and self.block_checksums.has_layout(record_store) and \
+                record_store.transactions_count >= self.block_checksums.transactions_count and \
+                all(stop <= record_store.transactions_count for _, stop in changed_ranges):
+            return changed_ranges, self.block_checksums.update(record_store, changed_ranges)
+        with instrumentation.span('checksums'):
+            block_checksums = BlockChecksums(record_store, self.checksum_block_size)
+        return self.block_checksums.changed_ranges(block_checksums), block_checksums
+
+    def merge_transactions(self, record_store: RecordStore, changed_ranges: list[tuple[int, int]]) -> int:
+        # Changed records are replaced in place and new ones appended, control sum is updated by difference of
+        # amounts, so merge costs as much as the change, not as the whole file
+        loaded_count = len(self.transactions)
+        synced_count = 0
+        for start, stop in changed_ranges:
+            stop = min(stop, loaded_count)
+            if start < stop:
+                self.replace_transactions(start, self.parse_transactions(record_store.read_transactions(start, stop)))
+                synced_count += stop - start
+        if record_store.transactions_count > loaded_count:
+            values = self.parse_transactions(record_store.read_transactions(loaded_count, record_store.transactions_count))
+            self.transactions = pd.concat([self.transactions, self.to_loaded_dtypes(values)], ignore_index=True)
+            self.control_sum += int(values['Amount'].sum())
+            synced_count += len(values)
+        return synced_count
+
+    def to_loaded_dtypes(self, values: pd.DataFrame) -> pd.DataFrame:
+        # Categories of parsed values which loaded transactions do not have yet are added to them first
+        for column in values.columns:
+            if isinstance(self.transactions[column].dtype, pd.CategoricalDtype):
+                new_categories = values[column].cat.categories.difference(self.transactions[column].cat.categories)
+                if len(new_categories):
+                    self.transactions[column] = self.transactions[column].cat.add_categories(new_categories)
+        return values.astype(self.transactions.dtypes.to_dict())
+
+    def replace_transactions(self, start: int, values: pd.DataFrame):
+        stop = start + len(values)
+        self.control_sum += int(values['Amount'].sum()) - int(self.transactions['Amount'].iloc[start:stop].sum())
+        values = self.to_loaded_dtypes(values)
+        for position, column in enumerate(self.transactions.columns):
+            self.transactions.iloc[start:stop, position] = values[column].array
+
+    def invalidate_cache(self):
+        if self.use_cache:
+            ParsedFileCache(self.filename).invalidate()
+
+    @instrumentation.timed('verify')
+    def verify_file(self) -> list[dict]:
+        return IntegrityVerifier(self).verify()
+
+    def read_file_in_chunks(self, chunk_size: int = 100000) -> ChunkedReader:
+        return ChunkedReader(self, chunk_size)
+
+    def load(self) -> Union[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame], bool]:
+        if self.is_loaded:
             return self.header, self.footer, self.transactions
+        return self.read_file()
+
+    def open_records(self) -> bool:
+        # Lazy access mode, records are parsed from memory mapped file only when they are requested
+        try:
+            self.record_store = RecordStore(self.filename).open()
+            return True
         except FileNotFoundError as fnfe:
-            logger.error(f'Check if file path is correct {self.filename}')
+            logger.error('Check if file path is correct %s', self.filename)
         except Exception as e:
-            logger.error(f'Check if file structure is not corrupted: {e}')
+            logger.warning('Records can not be accessed lazily: %s', e)
+        self.record_store = None
         return False
 
+    def close_records(self):
+        if self.record_store is not None:
+            self.record_store.close()
+
+    def count_transactions(self) -> int:
+        if self.is_loaded or self.record_store is None:
+            return len(self.transactions)
+        return self.record_store.transactions_count
+
+    def get_header(self) -> pd.DataFrame:
+        if self.is_loaded or self.record_store is None:
+            return self.header
+        return self.parse_header(self.record_store.read_header())
+
+    def get_footer(self) -> pd.DataFrame:
+        if self.is_loaded or self.record_store is None:
+            return self.footer
+        return self.parse_footer(self.record_store.read_footer())
+
+    def get_transactions(self, start: int, stop: int) -> pd.DataFrame:
+        if self.is_loaded or self.record_store is None:
+            return self.transactions.iloc[start:stop]
+        start, stop = self.record_store.clamp_range(start, stop)
+        transactions = self.parse_transactions(self.record_store.read_transactions(start, stop))
+        transactions.index = pd.RangeIndex(start, stop)
+        return transactions
+
+    def get_transaction(self, index: int) -> pd.Series:
+        if self.is_loaded or self.record_store is None:
+            return self.transactions.iloc[index]
+        transaction = self.parse_transactions(self.record_store.read_transaction(index)).iloc[0]
+        transaction.name = index
+        return transaction
+
+    def locate_counter(self, counter: int) -> Union[int, None]:
+        # Counters normally follow transaction order, so only one record is checked, index is used when they do not
+        index = counter - 1
+        if 0 <= index < self.count_transactions() and self.get_transaction(index)['Counter'] == counter:
+            return index
+        if not self.is_loaded:
+            return None
+        positions = self.get_transaction_index().query(min_counter=counter, max_counter=counter)
+        return int(positions[0]) if len(positions) else None
+
     def format_value(self, row: pd.Series) -> str:
         formatted_row = ''
         for col, value in row.items():
@@ -74,60 +414,436 @@ class FileInteractions:
             formatted_row += formatted_value
         return f'{formatted_row}\n'
 
+    def file_signature(self) -> tuple[str, int, int, int, int]:
+        # Inode changes when another process replaces the file by rename, modification time can have coarse
+        # resolution, so checksum of file end is added, footer there changes with almost every change of transactions
+        with open(self.filename, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            f.seek(max(stat.st_size - self.signature_tail_size, 0))
+            return self.filename, stat.st_size, stat.st_mtime_ns, stat.st_ino, zlib.crc32(f.read())
+
+    def is_file_in_sync(self) -> bool:
+        # Records can be patched in place only if file on disk is exactly the one which was loaded or last written
+        try:
+            return self.is_loaded and self.file_signature() == self.synced_signature
+        except OSError:
+            return False
+
+    def is_file_changed(self) -> bool:
+        # File was changed by another process since it was read or written by this one, missing file can be created
+        # and file with other name than the one which was read is written as a copy
+        try:
+            return self.synced_signature is not None and self.synced_signature[0] == self.filename and \
+                self.file_signature() != self.synced_signature
+        except OSError:
+            return False
+
+    def refuse_stale_write(self) -> bool:
+        logger.error('File %s was changed by another process since it was read, changes are not written to keep '
+                     'changes of the other process, read the file again and repeat them', self.filename)
+        return False
+
+    def refuse_stale_data_write(self) -> bool:
+        # Data written directly can already be changed in memory and match no version of file, so it can not
+        # be synchronized block by block
+        self.block_checksums = None
+        return self.refuse_stale_write()
+
+    def reopen_records(self):
+        if self.record_store is None:
+            return
+        try:
+            self.record_store.open()
+        except Exception as e:
+            logger.warning('Records can not be accessed lazily: %s', e)
+            self.record_store = None
+
+    def writable_record_store(self) -> RecordStore:
+        if self.record_store is None or self.record_store.filename != self.filename:
+            self.close_records()
+            self.record_store = RecordStore(self.filename).open()
+        return self.record_store
+
+    def calculate_footer(self) -> pd.DataFrame:
+        footer = self.footer.copy()
+        footer['Total Counter'] = self.total_counter
+        footer['Control Sum'] = self.control_sum
+        return footer
+
+    def format_transaction(self, position: int) -> bytes:
+        return self.format_value(self.transactions.iloc[position]).encode()
+
+    @instrumentation.timed('format')
+    def format_records(self, df: pd.DataFrame) -> bytes:
+        instrumentation.count('records_formatted', len(df))
+        columns = [(df[column].array if isinstance(df[column].dtype, pd.CategoricalDtype) else df[column].to_numpy(),
+                    self.max_lengths_dict[column], self.field_fillers.get(column))
+                   for column in df.columns]
+        return fixed_width.format_records(columns)
+
+    @instrumentation.timed('write')
     def write_to_file(self) -> int:
+        if self.is_file_changed():
+            return self.refuse_stale_data_write()
         try:
-            header = self.header.copy()
-            transactions = self.transactions.copy()
-            footer = self.footer.copy()
-            transactions['Amount'] = self.transactions['Amount'].apply(lambda x: int(x * 100))
-            footer['Total Counter'] = self.total_counter
-            footer['Control Sum'] = int(self.transactions['Amount'].sum() * 100)
-
-            with open(self.filename, 'w') as f:
-                for df in [header, transactions, footer]:
-                    formatted_lines = df.apply(lambda row: self.format_value(row), axis=1)
-                    for line in formatted_lines:
-                        f.write(line)
+            self.invalidate_cache()
+            footer = self.calculate_footer()
+
+            # File is written next to the original and renamed over it, so a crash never leaves it half written
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            fd, temp_filename = tempfile.mkstemp(prefix=f'.{os.path.basename(self.filename)}.', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for df in [self.header, self.transactions, footer]:
+                        for start in range(0, len(df), self.write_block_size):
+                            instrumentation.count('bytes_written',
+                                                  f.write(self.format_records(df.iloc[start:start + self.write_block_size])))
+                    f.flush()
+                    os.fsync(f.fileno())
+                if os.path.exists(self.filename):
+                    shutil.copymode(self.filename, temp_filename)
+                self.close_records()
+                os.replace(temp_filename, self.filename)
+            except BaseException:
+                if os.path.exists(temp_filename):
+                    os.remove(temp_filename)
+                raise
+            self.fsync_directory(directory)
+            self.reopen_records()
+            self.synced_signature = self.file_signature()
+            self.restart_change_log()
         except Exception as e:
-            logger.error(f'{e}')
+            logger.error('%s', e)
             return False
         return 'Successfuly written to file'
 
-    def add_new_transaction(self, values_dict: dict) -> int:
+    def fsync_directory(self, directory: str):
+        # Makes rename durable, not every platform allows opening directories
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @instrumentation.timed('write.patch')
+    def write_records(self, patch, *args, changed_ranges: list[tuple[int, int]] = ()) -> int:
+        # Patch only affected records, whole file is rewritten when it was not read or when patch can not be applied
+        # without moving other records, file changed by another process is not written at all. Patched ranges
+        # of transactions are logged for processes which track changes of the file
+        if self.is_file_changed():
+            return self.refuse_stale_data_write()
+        if not self.is_file_in_sync():
+            return self.write_to_file()
+        try:
+            self.invalidate_cache()
+            record_store = self.writable_record_store()
+            if not patch(record_store, *args):
+                return self.write_to_file()
+            previous_signature = self.synced_signature
+            self.synced_signature = self.file_signature()
+        except Exception as e:
+            logger.error('%s', e)
+            return False
+        self.log_patched_ranges(record_store, previous_signature, changed_ranges)
+        return 'Successfuly written to file'
+
+    def log_patched_ranges(self, record_store: RecordStore, previous_signature: tuple,
+                           changed_ranges: list[tuple[int, int]]):
+        # Log and checksums only let sync skip unchanged records, records are already in file, so a failure here
+        # does not fail the write
+        try:
+            ChangeLog(self.filename, self.change_log_max_size).append(previous_signature, self.synced_signature, list(changed_ranges))
+        except OSError as e:
+            logger.warning('Patched records could not be logged for processes tracking changes: %s', e)
+        if self.block_checksums is None:
+            return
+        try:
+            self.block_checksums.update(record_store, changed_ranges)
+        except (OSError, ValueError) as e:
+            logger.warning('Checksums of patched records could not be updated, file will be read whole again: %s', e)
+            self.block_checksums = None
+
+    def remove_change_log(self):
+        # Called by the process which held the file lock while tracking changes, other writers stop logging
+        try:
+            ChangeLog(self.filename).remove()
+        except OSError as e:
+            logger.warning('Log of patched records could not be removed: %s', e)
+        self.change_log_position = None
+
+    def restart_change_log(self):
+        # Records were rewritten, not patched, so readers compare checksums of all blocks once, best-effort as well
+        change_log = ChangeLog(self.filename)
+        try:
+            change_log.restart()
+        except OSError as e:
+            logger.warning('Log of patched records could not be started anew: %s', e)
+        if self.track_changes:
+            self.change_log_position = change_log.position()
+            self.block_checksums = self.compute_block_checksums()
+
+    def patch_header(self, record_store: RecordStore) -> bool:
+        header = self.fit_record(self.format_value(self.header.iloc[0]).encode(), record_store.header_size)
+        if header is None:
+            return False
+        record_store.write(0, header)
+        return True
+
+    def patch_footer(self, record_store: RecordStore) -> bool:
+        footer = self.format_value(self.calculate_footer().iloc[0]).encode()
+        record_store.write(record_store.footer_offset, footer, truncate=True)
+        return True
+
+    def fit_record(self, record: bytes, record_size: int) -> Union[bytes, None]:
+        # Records in file can be wider than layout (trailing spaces), keep their size so offsets do not move
+        if len(record) > record_size:
+            return None
+        return record[:-1].ljust(record_size - 1) + record[-1:]
+
+    def patch_transaction_record(self, record_store: RecordStore, position: int) -> bool:
+        transaction = self.fit_record(self.format_transaction(position), record_store.record_size)
+        if transaction is None or position >= record_store.transactions_count:
+            return False
+        record_store.write(record_store.record_offset(position), transaction)
+        return True
+
+    def patch_transaction(self, record_store: RecordStore, position: int) -> bool:
+        return self.patch_transaction_record(record_store, position) and self.patch_footer(record_store)
+
+    def fit_records(self, records: bytes, records_count: int, record_size: int) -> Union[bytes, None]:
+        if not records_count:
+            return b''
+        width = len(records) // records_count
+        if width * records_count != len(records) or width > record_size:
+            # Records of different sizes in bytes (non-ascii values), each one is fitted separately
+            fitted = [self.fit_record(record, record_size) for record in records.splitlines(keepends=True)]
+            return None if None in fitted else b''.join(fitted)
+        if width == record_size:
+            return records
+        fitted = np.full((records_count, record_size), fixed_width.SPACE, dtype=np.uint8)
+        fitted[:, :width - 1] = np.frombuffer(records, dtype=np.uint8).reshape(records_count, width)[:, :-1]
+        fitted[:, -1] = fixed_width.NEWLINE
+        return fitted.tobytes()
+
+    def patch_appended_transactions(self, record_store: RecordStore, start: int) -> bool:
+        # New records are written over old footer and new footer goes right after them
+        if start != record_store.transactions_count:
+            return False
+        transactions = self.fit_records(self.format_records(self.transactions.iloc[start:]),
+                                        len(self.transactions) - start, record_store.record_size)
+        if transactions is None:
+            return False
+        footer = self.format_value(self.calculate_footer().iloc[0]).encode()
+        record_store.write(record_store.footer_offset, transactions + footer, truncate=True)
+        return True
+
+    def write_header(self) -> int:
+        return self.write_records(self.patch_header)
+
+    def write_footer(self) -> int:
+        return self.write_records(self.patch_footer)
+
+    def write_transaction(self, position: int) -> int:
+        return self.write_records(self.patch_transaction, position, changed_ranges=[(position, position + 1)])
+
+    def append_transactions(self, start: int) -> int:
+        return self.write_records(self.patch_appended_transactions, start,
+                                  changed_ranges=[(start, len(self.transactions))])
+
+    def begin_edit_session(self) -> EditSession:
+        # While session is open, changes are applied in memory only and written once on commit
+        if self.edit_session is None:
+            self.edit_session = EditSession(self)
+        return self.edit_session
+
+    def fits_counter(self, new_transactions_count: int) -> bool:
+        # Counter of every transaction has to fit its field, longer one would be cut when file is written
+        max_transactions = 10 ** self.max_lengths_dict['Counter'] - 1
+        if len(self.transactions) + new_transactions_count > max_transactions:
+            logger.error('Validation error: File can hold at most %s transactions, it has %s and %s more do not fit\n',
+                         max_transactions, len(self.transactions), new_transactions_count)
+            return False
+        return True
+
+    def insert_transaction(self, values_dict: dict) -> bool:
+        if not self.fits_counter(1):
+            return False
         for key in values_dict.keys():
             values_dict[key] = self.run_validators(key, values_dict[key])
         if False in values_dict.values():
+            return False
+        self.insert_transactions(pd.DataFrame([values_dict]))
+        return True
+
+    def insert_transactions(self, values: pd.DataFrame):
+        # Counters are assigned to the whole block, new rows are cast to the same dtypes as loaded transactions,
+        # enlarging DataFrame with loc would turn typed columns into objects
+        values = values.assign(**{'Field id': '02',
+                                  'Counter': np.arange(len(self.transactions) + 1, len(self.transactions) + len(values) + 1)})
+        values = values.reindex(columns=self.transactions.columns, fill_value='')
+        self.transactions = pd.concat([self.transactions, values.astype(self.transactions.dtypes.to_dict())],
+                                      ignore_index=True)
+        self.total_counter = len(self.transactions)
+        self.control_sum += int(values['Amount'].sum())
+        self.transaction_index = None
+
+    @instrumentation.timed('validate.batch')
+    def validate_new_transactions(self, values: pd.DataFrame) -> Union[pd.DataFrame, bool]:
+        new_columns = ['Amount', 'Currency', 'Reserved']
+        not_allowed = [column for column in values.columns if column not in new_columns]
+        if not_allowed or 'Amount' not in values or 'Currency' not in values:
+            logger.error('Validation error: New transactions need columns %s, got %s\n', new_columns, list(values.columns))
+            return False
+        values = values.reset_index(drop=True)
+        validated = {column: self.run_validators(column, values[column]) for column in values.columns}
+        if any(column_values is False for column_values in validated.values()):
+            return False
+        return pd.DataFrame(validated).reindex(columns=new_columns, fill_value='')
+
+    def add_new_transactions(self, values: pd.DataFrame) -> int:
+        # Bulk counterpart of add_new_transaction, all rows are appended with one write
+        if self.is_change_stale():
+            self.refuse_stale_write()
+            return -1
+        values = self.validate_new_transactions(values)
+        if values is False or not self.fits_counter(len(values)):
             return -1
-        values_dict['Field id'] = '02'
-        values_dict['Counter'] = len(self.transactions) + 1
-        self.transactions.loc[len(self.transactions)] = values_dict
-        return self.write_to_file()
+        start = len(self.transactions)
+        self.insert_transactions(values)
+        if self.edit_session is not None:
+            return 'Transactions will be written to file on commit'
+        return self.append_transactions(start)
+
+    def add_new_transaction(self, values_dict: dict) -> int:
+        if self.is_change_stale():
+            self.refuse_stale_write()
+            return -1
+        if not self.insert_transaction(values_dict):
+            return -1
+        if self.edit_session is not None:
+            return 'Transaction will be written to file on commit'
+        return self.append_transactions(len(self.transactions) - 1)
+
+    def get_transaction_index(self) -> TransactionIndex:
+        if self.transaction_index is None:
+            self.transaction_index = TransactionIndex(self.transactions)
+        return self.transaction_index
+
+    @instrumentation.timed('query')
+    def query_transactions(self, currency: str = None, min_amount: int = None, max_amount: int = None,
+                           min_counter: int = None, max_counter: int = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+        # Matching transactions and their count and sum per currency, amounts are in cents
+        transaction_index = self.get_transaction_index()
+        positions = transaction_index.query(currency, min_amount, max_amount, min_counter, max_counter)
+        return self.transactions.iloc[positions], transaction_index.summary(positions)
+
+    def locate_field(self, field: pd.Series) -> tuple[str, pd.DataFrame]:
+        # Row passed from CLI can be a copy, so changed value is also set in DataFrame it comes from
+        for name, df in (('header', self.header), ('transactions', self.transactions), ('footer', self.footer)):
+            if list(field.index) == list(df.columns) and field.name in df.index:
+                return name, df
+        return '', None
+
+    def is_change_stale(self) -> bool:
+        # Checked before loaded data is changed, so refused change leaves it as it was
+        return self.edit_session is None and self.is_file_changed()
 
     def change_field_value(self, field_choice: int, field_value: str, field: pd.Series) -> int:
+        if self.is_change_stale():
+            return self.refuse_stale_write()
         field_value = self.run_validators(field.index[field_choice], field_value)
         if field_value:
-            field.iloc[field_choice] = field_value
-            logger.info(f'Value in column "{field.index[field_choice]}" changed successfuly to "{field_value}"')
+            column = field.index[field_choice]
+            name, df = self.locate_field(field)
+            previous_value = df.at[field.name, column] if name else None
+            if self.edit_session is not None and name:
+                self.edit_session.record_change(name, field.name, column, previous_value)
+            if name == 'transactions':
+                self.transaction_index = None
+                if column == 'Amount':
+                    self.control_sum += field_value - int(previous_value)
+            with pd.option_context('mode.chained_assignment', None):
+                field.iloc[field_choice] = field_value
+            display_value = self.cents_to_amount(field_value) if column == 'Amount' else field_value
+            logger.info('Value in column "%s" changed successfuly to "%s"', column, display_value)
+            if name:
+                df.at[field.name, column] = field_value
+            if self.edit_session is not None:
+                return field_value
+            if name == 'header':
+                return self.write_header()
+            elif name == 'transactions':
+                return self.write_transaction(self.transactions.index.get_loc(field.name))
+            elif name == 'footer':
+                return self.write_footer()
             return self.write_to_file()
         return field_value
 
-    def run_validators(self, field_column: str, field_value: str) -> Union[bool, float, str]:
+    @instrumentation.timed('validate')
+    def run_validators(self, field_column: str, field_value: Union[str, pd.Series]) -> Union[bool, int, str, pd.Series]:
+        if isinstance(field_value, pd.Series):
+            return self.run_batch_validators(field_column, field_value)
         if not custom_validators.validate_locked_column_name(field_column, self.locked_to_write_access_fields):
-            logger.error(f'Validation error: Trying to change value in locked column "{field_column}"\n')
+            logger.error('Validation error: Trying to change value in locked column "%s"\n', field_column)
             return False
 
         if field_column == 'Amount':
             if not custom_validators.validate_float(field_value):
-                logger.error(f'Validation error: "{field_value}" is not a float\n')
+                logger.error('Validation error: "%s" is not a float\n', field_value)
+                return False
+            field_value = self.amount_to_cents(field_value)
+            if field_value is None:
+                logger.error('Validation error: Amount has to be a finite number\n')
+                return False
+            if field_value < 0:
+                logger.error('Validation error: Amount "%s" can not be negative\n', self.cents_to_amount(field_value))
                 return False
-            field_value = round(float(field_value), 2)
         elif field_column == 'Currency':
             if not custom_validators.validate_available_currency(field_value, self.availabe_currencies):
-                logger.error(f'Validation error: Currency "{field_value}" is not available. '
-                             f'Available currencies: {self.availabe_currencies}\n')
+                logger.error('Validation error: Currency "%s" is not available. Available currencies: %s\n',
+                             field_value, self.availabe_currencies)
                 return False
         max_length_for_field = self.max_lengths_dict.get(field_column)
         if not custom_validators.validate_length(str(field_value), max_length_for_field):
-            logger.error(f'Validation error: "{field_value}" contains more than {max_length_for_field} characters\n')
+            logger.error('Validation error: "%s" contains more than %s characters\n', field_value, max_length_for_field)
             return False
         return field_value
+
+    def run_batch_validators(self, field_column: str, values: pd.Series) -> Union[bool, pd.Series]:
+        # Whole column is validated at once, errors are reported with first offending rows
+        instrumentation.count('values_validated', len(values))
+        if not custom_validators.validate_locked_column_names([field_column], self.locked_to_write_access_fields)[0]:
+            logger.error('Validation error: Trying to change value in locked column "%s"\n', field_column)
+            return False
+        max_length_for_field = self.max_lengths_dict.get(field_column)
+        checks = []
+        if field_column == 'Amount':
+            is_number, numbers = custom_validators.validate_floats(values)
+            is_number &= np.isfinite(numbers)
+            # Numbers too big for the field are not converted, they would overflow integer cents
+            is_convertible = is_number & (numbers.abs() < 10 ** (max_length_for_field - 2))
+            values = self.amounts_to_cents(values, numbers, is_convertible)
+            checks.append((is_number, 'Amount is not a float'))
+            checks.append((~is_number | (values >= 0), 'Amount can not be negative'))
+            is_valid_length = ~is_number | (is_convertible & custom_validators.validate_lengths(values, max_length_for_field))
+        else:
+            values = values.astype(str)
+            if field_column == 'Currency':
+                checks.append((custom_validators.validate_available_currencies(values, self.availabe_currencies),
+                               f'Currency is not available. Available currencies: {self.availabe_currencies}'))
+            is_valid_length = custom_validators.validate_lengths(values, max_length_for_field)
+        checks.append((is_valid_length, f'{field_column} contains more than {max_length_for_field} characters'))
+
+        is_valid = True
+        for is_valid_value, message in checks:
+            invalid_rows = np.flatnonzero(~is_valid_value.to_numpy())
+            if len(invalid_rows):
+                logger.error('Validation error: %s in %s rows, first of them: %s\n',
+                             message, len(invalid_rows), invalid_rows[:10].tolist())
+                is_valid = False
+        return values if is_valid else False
@@ -0,0 +1,42 @@
+import fcntl
+import os
+
+
+class FileLock:
+    # Advisory lock of a file next to the data file, the data file itself is replaced by every full rewrite,
+    # so a lock held on it would be lost
+    def __init__(self, filename: str):
+        directory, basename = os.path.split(os.path.abspath(filename))
+        self.lock_filename = os.path.join(directory, f'.{basename}.lock')
+        self.file = None
+
+    def acquire(self, blocking: bool = False) -> bool:
+        while self.file is None:
+            lock_file = open(self.lock_filename, 'a')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            # Lock file is removed by release, lock taken on removed file would not exclude anybody, so it is retried
+            if os.path.exists(self.lock_filename) and \
+                    os.path.samestat(os.fstat(lock_file.fileno()), os.stat(self.lock_filename)):
+                self.file = lock_file
+            else:
+                lock_file.close()
+        return True
+
+    def release(self):
+        if self.file is not None:
+            os.remove(self.lock_filename)
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+
+    def __enter__(self) -> 'FileLock':
+        if not self.acquire():
+            raise BlockingIOError(f'File is locked by another process, lock file {self.lock_filename}')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
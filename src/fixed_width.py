@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from typing import Union
+
+NEWLINE = ord('\n')
+SPACE = ord(' ')
+ZERO = ord('0')
+NINE = ord('9')
+
+
+def split_file_bytes(raw: bytes) -> tuple[bytes, bytes, bytes]:
+    # Header is the first line, footer is the last one, everything in between are transactions
+    header_end = raw.find(b'\n') + 1 or len(raw)
+    search_end = len(raw) - 1 if raw.endswith(b'\n') else len(raw)
+    footer_start = max(raw.rfind(b'\n', header_end, search_end) + 1, header_end)
+    return raw[:header_end], raw[header_end:footer_start], raw[footer_start:]
+
+
+def records_as_array(block: bytes) -> Union[np.ndarray, None]:
+    # View block of equally sized ascii records as 2D array (one row per record), None if block is not fixed-width
+    if not block:
+        return np.empty((0, 0), dtype=np.uint8)
+    record_size = block.find(b'\n') + 1
+    if not record_size or len(block) % record_size or not block.isascii():
+        return None
+    records = np.frombuffer(block, dtype=np.uint8).reshape(-1, record_size)
+    if not (records[:, -1] == NEWLINE).all():
+        return None
+    return records
+
+
+def slice_text_column(records: np.ndarray, start: int, stop: int) -> np.ndarray:
+    column = records[:, start:stop]
+    values = np.full(len(records), '', dtype=object)
+    # Mostly blank columns (Reserved) are common, decode only records which have anything in them
+    filled = ~(column == SPACE).all(axis=1)
+    if filled.any():
+        width = stop - start
+        raw_values = np.ascontiguousarray(column[filled]).view(f'S{width}').ravel()
+        values[filled] = np.char.strip(raw_values.astype(f'U{width}'))
+    return values
+
+
+def slice_int_column(records: np.ndarray, start: int, stop: int) -> Union[np.ndarray, None]:
+    # Column of digits converted to int64 without touching python objects, None if column is not purely numeric
+    if not len(records):
+        return np.array([], dtype=np.int64)
+    column = records[:, start:stop]
+    if not ((column >= ZERO) & (column <= NINE)).all():
+        return None
+    weights = 10 ** np.arange(stop - start - 1, -1, -1, dtype=np.int64)
+    return (column - ZERO).astype(np.int64) @ weights
+
+
+def format_int_column(values: np.ndarray, width: int) -> Union[np.ndarray, None]:
+    # Zero filled digits of integer column as (records, width) byte array, None if column is not integer.
+    # Integers which do not fit the field are refused, formatted as text they would corrupt the record
+    if values.dtype.kind not in 'iu':
+        if pd.api.types.infer_dtype(values, skipna=False) != 'integer':
+            return None
+        try:
+            values = values.astype(np.int64)
+        except OverflowError:
+            raise ValueError(f'Integer values do not fit field of {width} digits')
+    if len(values) and values.min() < 0:
+        raise ValueError(f'Negative integer {values.min()} can not be written to field of {width} digits')
+    if width > 18:
+        # Digits of such field do not fit int64, non-negative values are formatted as text correctly
+        return None
+    if len(values) and values.max() >= 10 ** width:
+        raise ValueError(f'Integer {values.max()} does not fit field of {width} digits')
+    weights = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (values.astype(np.int64)[:, None] // weights % 10 + ZERO).astype(np.uint8)
+
+
+def format_text_column(values: np.ndarray, width: int, filler: str) -> tuple[np.ndarray, list[str]]:
+    # Every distinct value is formatted once, column is rebuilt from codes
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes, [f'{str(value)[:width]:{filler}>{width}}' for value in uniques]
+
+
+def format_records_as_text(columns: list[tuple[np.ndarray, int, str]]) -> bytes:
+    # Slower path for values which are wider in bytes than in characters
+    lines = None
+    for values, width, filler in columns:
+        codes, formatted = format_text_column(values, width, filler)
+        column = np.array(formatted, dtype=object)[codes]
+        lines = column if lines is None else lines + column
+    if lines is None or not len(lines):
+        return b''
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def format_records(columns: list[tuple[np.ndarray, int, str]]) -> bytes:
+    # Columns are (values, width, filler), each one is right aligned in its field and truncated to its width
+    records_count = len(columns[0][0]) if columns else 0
+    records = np.empty((records_count, sum(width for _, width, _ in columns) + 1), dtype=np.uint8)
+    records[:, -1] = NEWLINE
+    position = 0
+    for values, width, filler in columns:
+        column = format_int_column(values, width) if filler == '0' else None
+        if column is None:
+            codes, formatted = format_text_column(values, width, filler)
+            encoded = b''.join(value.encode() for value in formatted)
+            if len(encoded) != len(formatted) * width:
+                return format_records_as_text(columns)
+            column = np.frombuffer(encoded, dtype=np.uint8).reshape(-1, width)[codes]
+        records[:, position:position + width] = column
+        position += width
+    return records.tobytes()
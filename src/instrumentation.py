@@ -0,0 +1,126 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+# Timing spans and counters of hot paths, collected only after enable() is called, otherwise every instrumented call
+# costs one flag check. Profiling and memory tracing are imported and started only when requested.
+ENVIRONMENT_VARIABLES = {'metrics': 'FIXED_WIDTH_METRICS',
+                         'profile': 'FIXED_WIDTH_PROFILE',
+                         'trace_memory': 'FIXED_WIDTH_TRACE_MEMORY'}
+
+enabled = False
+spans = {}
+counters = {}
+profiler = None
+trace_memory = False
+disabled_span = contextlib.nullcontext()
+
+
+class Span:
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record_span(self.name, time.perf_counter() - self.start)
+
+
+def record_span(name: str, seconds: float):
+    span_metrics = spans.get(name)
+    if span_metrics is None:
+        spans[name] = span_metrics = {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+    span_metrics['count'] += 1
+    span_metrics['total_seconds'] += seconds
+    span_metrics['max_seconds'] = max(span_metrics['max_seconds'], seconds)
+
+
+def span(name: str):
+    return Span(name) if enabled else disabled_span
+
+
+def timed(name: str):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record_span(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: int = 1):
+    if enabled:
+        counters[name] = counters.get(name, 0) + value
+
+
+def summary() -> dict:
+    result = {'spans': {name: dict(span_metrics) for name, span_metrics in spans.items()},
+              'counters': dict(counters)}
+    if trace_memory:
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top_allocations = tracemalloc.take_snapshot().statistics('lineno')[:10]
+            result['memory'] = {'current_bytes': current, 'peak_bytes': peak,
+                                'top_allocations': [str(statistic) for statistic in top_allocations]}
+    return result
+
+
+def write_summary(metrics_output: str):
+    if metrics_output == '-':
+        json.dump(summary(), sys.stderr, indent=4)
+        sys.stderr.write('\n')
+        return
+    with open(metrics_output, 'w') as f:
+        json.dump(summary(), f, indent=4)
+
+
+def stop_profiler(profile_output: str):
+    profiler.disable()
+    profiler.dump_stats(profile_output)
+
+
+def enable(metrics_output: str = None, profile_output: str = None, memory_tracing: bool = False):
+    # Metrics are written as JSON at exit, '-' means standard error, profile is stored in pstats format
+    global enabled, profiler, trace_memory
+    enabled = True
+    if memory_tracing and not trace_memory:
+        import tracemalloc
+        trace_memory = True
+        tracemalloc.start()
+    if profile_output and profiler is None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        atexit.register(stop_profiler, profile_output)
+    if metrics_output:
+        atexit.register(write_summary, metrics_output)
+
+
+def configure(metrics_output: str = None, profile_output: str = None, memory_tracing: bool = False):
+    # Command line options take precedence over environment variables
+    metrics_output = metrics_output or os.environ.get(ENVIRONMENT_VARIABLES['metrics'])
+    profile_output = profile_output or os.environ.get(ENVIRONMENT_VARIABLES['profile'])
+    memory_tracing = memory_tracing or os.environ.get(ENVIRONMENT_VARIABLES['trace_memory'], '') not in ('', '0')
+    if memory_tracing and not metrics_output:
+        metrics_output = '-'
+    if metrics_output or profile_output or memory_tracing:
+        enable(metrics_output, profile_output, memory_tracing)
+
+
+def reset():
+    spans.clear()
+    counters.clear()
@@ -0,0 +1,121 @@
+import numpy as np
+
+import fixed_width
+
+BLANK_CHARACTERS = (ord(' '), ord('\r'), ord('\t'))
+
+
+class IntegrityVerifier:
+    # Whole file is checked column by column on arrays of character codes, every problem is reported as
+    # {'line': line number in file, 'field': column or None, 'error': message}
+    def __init__(self, file_interactions):
+        self.file_interactions = file_interactions
+        self.record_width = file_interactions.transaction_positions[-1]
+        self.errors = []
+        # Filled by verify, transactions with not allowed currency are not counted
+        self.transactions_count = 0
+        self.currency_totals = {}
+
+    def verify(self) -> list[dict]:
+        self.errors = []
+        with open(self.file_interactions.filename, 'rb') as f:
+            header_line, transactions_block, footer_line = fixed_width.split_file_bytes(f.read())
+        header, header_lengths = self.records_matrix(header_line)
+        transactions, lengths = self.records_matrix(transactions_block)
+        footer, footer_lengths = self.records_matrix(footer_line)
+        self.verify_layout(header, header_lengths, 1)
+        self.verify_field_id(header, '01', 1)
+        counters, amounts = self.verify_transactions(transactions, lengths)
+        self.transactions_count = len(transactions)
+        footer_line_number = len(transactions) + 2
+        self.verify_layout(footer, footer_lengths, footer_line_number)
+        self.verify_field_id(footer, '03', footer_line_number)
+        self.verify_footer_totals(footer, footer_line_number, len(transactions), int(amounts.sum()))
+        return sorted(self.errors, key=lambda error: error['line'])
+
+    def records_matrix(self, block: bytes) -> tuple[np.ndarray, np.ndarray]:
+        # Character codes as (records, width) array, records shorter than the widest one are padded with zeros
+        records = fixed_width.records_as_array(block)
+        if records is not None and len(records):
+            return records[:, :-1], np.full(len(records), records.shape[1] - 1)
+        lines = block.decode().splitlines()
+        if not lines:
+            return np.zeros((0, self.record_width), dtype=np.uint32), np.zeros(0, dtype=np.int64)
+        lengths = np.array([len(line) for line in lines])
+        matrix = np.array(lines, dtype=f'U{max(lengths.max(), 1)}')
+        return matrix.view(np.uint32).reshape(len(lines), -1), lengths
+
+    def column(self, matrix: np.ndarray, start: int, stop: int) -> np.ndarray:
+        column = np.zeros((len(matrix), stop - start), dtype=matrix.dtype)
+        available = matrix[:, start:stop]
+        column[:, :available.shape[1]] = available
+        return column
+
+    def report(self, rows: np.ndarray, first_line: int, field, message):
+        for row in rows:
+            self.errors.append({'line': int(row) + first_line, 'field': field,
+                                'error': message(row) if callable(message) else message})
+
+    def verify_layout(self, matrix: np.ndarray, lengths: np.ndarray, first_line: int):
+        self.report(np.flatnonzero(lengths < self.record_width), first_line, None,
+                    lambda row: f'Record is {lengths[row]} characters long, expected {self.record_width}')
+        beyond_layout = matrix[:, self.record_width:]
+        positions = np.arange(self.record_width, matrix.shape[1])
+        not_blank = ~np.isin(beyond_layout, BLANK_CHARACTERS) & (positions < lengths[:, None])
+        self.report(np.flatnonzero(not_blank.any(axis=1)), first_line, None,
+                    f'Characters after position {self.record_width} are not part of any field and are ignored')
+
+    def verify_field_id(self, matrix: np.ndarray, field_id: str, first_line: int):
+        expected = np.array([ord(character) for character in field_id])
+        wrong = ~(self.column(matrix, 0, len(field_id)) == expected).all(axis=1)
+        self.report(np.flatnonzero(wrong), first_line, 'Field id', f'Field id has to be "{field_id}"')
+
+    def numeric_column(self, matrix: np.ndarray, start: int, stop: int, first_line: int,
+                       field: str) -> tuple[np.ndarray, np.ndarray]:
+        column = self.column(matrix, start, stop)
+        is_numeric = ((column >= fixed_width.ZERO) & (column <= fixed_width.NINE)).all(axis=1)
+        self.report(np.flatnonzero(~is_numeric), first_line, field, f'{field} has to contain only digits')
+        digits = np.where(is_numeric[:, None], column.astype(np.int64) - fixed_width.ZERO, 0)
+        weights = 10 ** np.arange(stop - start - 1, -1, -1, dtype=np.int64)
+        return digits @ weights, is_numeric
+
+    def verify_transactions(self, matrix: np.ndarray, lengths: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        first_line = 2
+        fi = self.file_interactions
+        bounds = {column: (start, stop) for column, start, stop
+                  in fi.column_bounds(fi.transactions.columns, fi.transaction_positions)}
+        self.verify_layout(matrix, lengths, first_line)
+        self.verify_field_id(matrix, '02', first_line)
+        counters, counters_numeric = self.numeric_column(matrix, *bounds['Counter'], first_line, 'Counter')
+        amounts, _ = self.numeric_column(matrix, *bounds['Amount'], first_line, 'Amount')
+        expected_counters = np.arange(1, len(matrix) + 1)
+        self.report(np.flatnonzero(counters_numeric & (counters != expected_counters)), first_line, 'Counter',
+                    lambda row: f'Counter is {counters[row]}, expected {expected_counters[row]}')
+
+        start, stop = bounds['Currency']
+        currencies = np.array([[ord(character) for character in f'{currency:>{stop - start}}'[:stop - start]]
+                               for currency in fi.availabe_currencies])
+        column = self.column(matrix, start, stop)
+        matches = (column[:, None, :] == currencies[None, :, :]).all(axis=2)
+        allowed = matches.any(axis=1)
+        self.report(np.flatnonzero(~allowed), first_line, 'Currency',
+                    f'Currency has to be one of {fi.availabe_currencies}')
+        currency_codes = matches.argmax(axis=1)[allowed]
+        allowed_amounts = amounts[allowed]
+        counts = np.bincount(currency_codes, minlength=len(currencies))
+        # Weighted bincount sums in float64, which loses cents of large totals, so sums are taken as int64
+        sums = [int(allowed_amounts[currency_codes == code].sum()) for code in range(len(currencies))]
+        self.currency_totals = {currency: {'Count': int(counts[code]), 'Amount': sums[code]}
+                                for code, currency in enumerate(fi.availabe_currencies) if counts[code]}
+        return counters, amounts
+
+    def verify_footer_totals(self, footer: np.ndarray, line: int, total_counter: int, control_sum: int):
+        fi = self.file_interactions
+        bounds = {column: (start, stop) for column, start, stop
+                  in fi.column_bounds(fi.footer.columns, fi.footer_positions)}
+        for field, calculated in (('Total Counter', total_counter), ('Control Sum', control_sum)):
+            values, is_numeric = self.numeric_column(footer, *bounds[field], line, field)
+            for value in values[is_numeric]:
+                if value != calculated:
+                    self.errors.append({'line': line, 'field': field,
+                                        'error': f'{field} is {value}, but transactions give {calculated}'})
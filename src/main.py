@@ -1,19 +1,48 @@
-import pandas as pd
+import os
+import sys
 
-from colored_logger import logger
-from cli_interactions import user_interaction
-from file_interactions import FileInteractions
+import instrumentation
+from colored_logger import logger, set_level
+from cli_commands import create_parser, run_command
+from file_lock import FileLock
 
 
-def main():
+def interactive_mode(filename: str, parse_processes: int = 1):
+    # Interactive menu works with whole table, so pandas is imported only here and not for single commands
+    from cli_interactions import user_interaction
+    from file_interactions import FileInteractions
+
+    # Menu can change the file at any time, so it is not started while session server or other writer holds it
+    file_lock = FileLock(filename)
+    if os.path.exists(filename) and not file_lock.acquire():
+        logger.error('File %s is served or edited by another process, change it with commands '
+                     '(sent to session server if it runs) or wait until it is released', filename)
+        return
     print('Welcome to the CLI tool.')
+    fi = FileInteractions(filename, use_cache=True, parse_processes=parse_processes, track_changes=True)
     try:
-        fi = FileInteractions('task_data.txt')
-        header, footer, transactions = fi.read_file()
+        # Memory mapped access lets browsing start without parsing whole file, fall back to full read otherwise
+        if fi.open_records():
+            header, footer, transactions = fi.get_header(), fi.get_footer(), fi.transactions
+        else:
+            header, footer, transactions = fi.read_file()
         user_interaction(fi, header, footer, transactions)
     except Exception as e:
-        logger.error(f'{e}')
+        logger.error('%s', e)
+    finally:
+        fi.remove_change_log()
+        file_lock.release()
+
+
+def main():
+    args = create_parser().parse_args()
+    instrumentation.configure(args.metrics, args.profile, args.trace_memory)
+    if args.log_level:
+        set_level(args.log_level)
+    if args.command:
+        sys.exit(run_command(args))
+    interactive_mode(args.file, args.parse_processes or None)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
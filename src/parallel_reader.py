@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Union
+
+from colored_logger import logger
+from record_store import RecordStore
+
+
+def pack_column(values: pd.Series) -> tuple[str, np.ndarray, Union[list, None]]:
+    # Text columns are sent to parent as integer codes and their distinct values, so only numeric arrays are pickled
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return 'category', values.cat.codes.to_numpy(), list(values.cat.categories)
+    if values.dtype == object:
+        codes, labels = pd.factorize(values)
+        return 'object', codes, list(labels)
+    return 'array', values.to_numpy(), None
+
+
+def unpack_columns(packed_shards: list[dict], columns: pd.Index) -> pd.DataFrame:
+    data = {}
+    for column in columns:
+        parts = [packed_shard[column] for packed_shard in packed_shards]
+        kind = parts[0][0]
+        if kind == 'array':
+            data[column] = np.concatenate([values for _, values, _ in parts])
+        elif kind == 'object':
+            data[column] = np.concatenate([np.array(labels + [None], dtype=object)[codes] for _, codes, labels in parts])
+        else:
+            # Codes of every shard are mapped to categories of all shards, missing value code -1 stays -1
+            categories = list(dict.fromkeys(category for _, _, labels in parts for category in labels))
+            category_codes = {category: code for code, category in enumerate(categories)}
+            codes = [np.array([category_codes[label] for label in labels] + [-1], dtype=np.int32)[shard_codes]
+                     for _, shard_codes, labels in parts]
+            data[column] = pd.Categorical.from_codes(np.concatenate(codes), categories=categories, validate=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def parse_shard(filename: str, first_index: int, start: int, stop: int) -> tuple[dict, dict]:
+    # Runs in worker process, shard is a range of whole transaction records
+    from file_interactions import FileInteractions
+
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        block = f.read(stop - start)
+    transactions = FileInteractions(filename).parse_transactions(block)
+    expected_counters = np.arange(first_index + 1, first_index + len(transactions) + 1)
+    wrong_counters = np.flatnonzero(transactions['Counter'].to_numpy() != expected_counters) + first_index
+    shard_check = {'first_index': first_index,
+                   'count': len(transactions),
+                   'control_sum': int(transactions['Amount'].sum()),
+                   'wrong_counters': wrong_counters.tolist()}
+    return {column: pack_column(transactions[column]) for column in transactions.columns}, shard_check
+
+
+def split_into_shards(record_store: RecordStore, shard_size: int) -> list[tuple[int, int, int]]:
+    shards = []
+    for first_index in range(0, record_store.transactions_count, shard_size):
+        stop_index = min(first_index + shard_size, record_store.transactions_count)
+        shards.append((first_index, record_store.record_offset(first_index), record_store.record_offset(stop_index)))
+    return shards
+
+
+def parse_transactions_parallel(file_interactions, record_store: RecordStore, processes: int,
+                                shard_size: int = None) -> tuple[pd.DataFrame, list[dict]]:
+    processes = processes or os.cpu_count()
+    if shard_size is None:
+        # Few shards per process, so faster processes can take over work of slower ones
+        shard_size = max(record_store.transactions_count // (processes * 4), 50000)
+    shards = split_into_shards(record_store, shard_size)
+    if not shards:
+        return file_interactions.parse_transactions(b''), []
+    with ProcessPoolExecutor(min(processes, len(shards))) as executor:
+        results = list(executor.map(parse_shard, repeat(record_store.filename), *zip(*shards)))
+    transactions = unpack_columns([packed_shard for packed_shard, _ in results], file_interactions.transactions.columns)
+    return file_interactions.cast_transactions(transactions), [shard_check for _, shard_check in results]
+
+
+def log_shard_checks(shard_checks: list[dict], footer: pd.DataFrame):
+    for shard_check in shard_checks:
+        if shard_check['wrong_counters']:
+            logger.warning('Transactions %s have Counter out of order (%s in shard starting at %s)',
+                           shard_check['wrong_counters'][:10], len(shard_check['wrong_counters']),
+                           shard_check['first_index'])
+    total_counter = sum(shard_check['count'] for shard_check in shard_checks)
+    control_sum = sum(shard_check['control_sum'] for shard_check in shard_checks)
+    for column, calculated in (('Total Counter', total_counter), ('Control Sum', control_sum)):
+        value = footer[column].iloc[0]
+        if not value.isdigit() or int(value) != calculated:
+            logger.warning('Footer %s is "%s", but transactions give %s', column, value, calculated)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Union
+
+from colored_logger import logger
+
+
+class ParsedFileCache:
+    # Parsed columns are kept next to the file as .npy arrays and loaded with memory mapping, cache is valid only
+    # for the file with the same size, modification time and checksum of its first and last block. Every save writes
+    # arrays to a new directory, files which can be mapped by loaded DataFrames are never overwritten, only removed.
+    checksum_block_size = 65536
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        directory, basename = os.path.split(os.path.abspath(filename))
+        self.cache_directory = os.path.join(directory, f'.{basename}.cache')
+        self.meta_filename = os.path.join(self.cache_directory, 'meta.json')
+
+    def file_signature(self) -> dict:
+        checksum = hashlib.blake2b(digest_size=16)
+        with open(self.filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            checksum.update(f.read(self.checksum_block_size))
+            f.seek(max(size - self.checksum_block_size, 0))
+            checksum.update(f.read(self.checksum_block_size))
+        return {'size': size, 'mtime_ns': mtime_ns, 'checksum': checksum.hexdigest()}
+
+    def array_filename(self, name: str) -> str:
+        return os.path.join(self.cache_directory, f'{name}.npy')
+
+    def load(self, transactions_columns: pd.Index) -> Union[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame], None]:
+        try:
+            with open(self.meta_filename, 'r') as f:
+                meta = json.load(f)
+            if meta['signature'] != self.file_signature():
+                return None
+            header = pd.DataFrame(meta['header']['values'], columns=meta['header']['columns'])
+            footer = pd.DataFrame(meta['footer']['values'], columns=meta['footer']['columns'])
+            data = {}
+            for column in transactions_columns:
+                # Copy-on-write mapping, so loaded DataFrame can be changed without touching the cache
+                values = np.load(self.array_filename(meta['arrays'][column]), mmap_mode='c')
+                if column in meta['categories']:
+                    values = pd.Categorical.from_codes(values, categories=meta['categories'][column])
+                elif column in meta['labels']:
+                    values = np.array(meta['labels'][column], dtype=object)[values]
+                data[column] = values
+            transactions = pd.DataFrame(data, columns=transactions_columns, copy=False)
+            if len(transactions) != meta['transactions_count']:
+                return None
+            return header, footer, transactions
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning('Parsed file cache could not be loaded: %s', e)
+            return None
+
+    def save(self, signature: dict, header: pd.DataFrame, footer: pd.DataFrame, transactions: pd.DataFrame):
+        try:
+            self.invalidate()
+            os.makedirs(self.cache_directory, exist_ok=True)
+            arrays_directory = os.path.basename(tempfile.mkdtemp(prefix='arrays_', dir=self.cache_directory))
+            meta = {'signature': signature,
+                    'header': {'columns': list(header.columns), 'values': header.values.tolist()},
+                    'footer': {'columns': list(footer.columns), 'values': footer.values.tolist()},
+                    'transactions_count': len(transactions),
+                    'arrays': {},
+                    'categories': {},
+                    'labels': {}}
+            for position, column in enumerate(transactions.columns):
+                values = transactions[column]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    meta['categories'][column] = list(values.cat.categories)
+                    values = values.cat.codes.to_numpy()
+                elif values.dtype == object:
+                    values, labels = pd.factorize(values)
+                    meta['labels'][column] = list(labels)
+                else:
+                    values = values.to_numpy()
+                meta['arrays'][column] = os.path.join(arrays_directory, f'column_{position}')
+                np.save(self.array_filename(meta['arrays'][column]), values)
+            # Meta file is written last, cache without it is never used
+            temp_meta_filename = f'{self.meta_filename}.tmp'
+            with open(temp_meta_filename, 'w') as f:
+                json.dump(meta, f)
+            os.replace(temp_meta_filename, self.meta_filename)
+            self.remove_old_arrays(arrays_directory)
+        except Exception as e:
+            logger.warning('Parsed file cache could not be saved: %s', e)
+
+    def remove_old_arrays(self, arrays_directory: str):
+        # Removed files stay readable through existing memory mappings until they are closed
+        for name in os.listdir(self.cache_directory):
+            path = os.path.join(self.cache_directory, name)
+            if name.startswith('arrays_') and name != arrays_directory:
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.endswith('.npy'):
+                os.remove(path)
+
+    def invalidate(self):
+        try:
+            os.remove(self.meta_filename)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+import record_layout
+from record_store import RecordStore
+
+
+class QuickReader:
+    # Single records are read from memory mapped file with standard library only, so short queries from scripts
+    # do not pay for importing pandas
+    def __init__(self, filename: str):
+        self.record_store = RecordStore(filename)
+
+    def __enter__(self) -> 'QuickReader':
+        self.record_store.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.record_store.close()
+
+    def count_transactions(self) -> int:
+        return self.record_store.transactions_count
+
+    def get_header(self) -> dict[str, str]:
+        return record_layout.split_record(self.record_store.read_header().decode(),
+                                          record_layout.HEADER_COLUMNS, record_layout.HEADER_POSITIONS)
+
+    def get_footer(self) -> dict[str, str]:
+        return record_layout.split_record(self.record_store.read_footer().decode(),
+                                          record_layout.FOOTER_COLUMNS, record_layout.FOOTER_POSITIONS)
+
+    def get_transaction(self, index: int) -> dict[str, str]:
+        # Values are shown the same way as in CLI, Counter without leading zeros and Amount in currency units
+        transaction = record_layout.split_record(self.record_store.read_transaction(index).decode(),
+                                                 record_layout.TRANSACTION_COLUMNS,
+                                                 record_layout.TRANSACTION_POSITIONS)
+        for column in ('Counter', 'Amount'):
+            if not transaction[column].isdigit():
+                raise ValueError(f'{column} of transaction {index} has to contain only digits')
+        transaction['Counter'] = str(int(transaction['Counter']))
+        transaction['Amount'] = str(Decimal(int(transaction['Amount'])).scaleb(-2))
+        return transaction
+
+
+def format_record(record: dict[str, str]) -> str:
+    # Same layout as printed pandas Series, names aligned to the left and values to the right
+    names_width = max(len(name) for name in record)
+    values_width = max(len(value) for value in record.values())
+    return '\n'.join(f'{name:<{names_width}}    {value:>{values_width}}' for name, value in record.items())
+
+
+def format_table(columns: list[str], rows: list[list[str]]) -> str:
+    widths = [max([len(column)] + [len(row[position]) for row in rows]) for position, column in enumerate(columns)]
+    lines = [columns] + rows
+    return '\n'.join('  '.join(f'{value:>{width}}' for value, width in zip(line, widths)) for line in lines)
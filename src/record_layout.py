@@ -0,0 +1,16 @@
+# Layout of records in fixed-width file, kept free of heavy imports so quick reads can use it without pandas
+HEADER_COLUMNS = ['Field id', 'Name', 'Surname', 'Patronymic', 'Address']
+HEADER_POSITIONS = (2, 30, 60, 90, 120)
+TRANSACTION_COLUMNS = ['Field id', 'Counter', 'Amount', 'Currency', 'Reserved']
+TRANSACTION_POSITIONS = (2, 8, 20, 23, 120)
+FOOTER_COLUMNS = ['Field id', 'Total Counter', 'Control Sum', 'Reserved']
+FOOTER_POSITIONS = (2, 8, 20, 120)
+
+
+def split_record(line: str, columns: list[str], positions: tuple) -> dict[str, str]:
+    record = {}
+    prev_position = 0
+    for column, position in zip(columns, positions):
+        record[column] = line[prev_position:position].strip()
+        prev_position = position
+    return record
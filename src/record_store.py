@@ -0,0 +1,83 @@
+import mmap
+
+import instrumentation
+
+
+class RecordStore:
+    # Random access to fixed-width file records through memory mapping, nothing is read until it is requested
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file = None
+        self.mmap = None
+        self.header_size = 0
+        self.record_size = 0
+        self.footer_offset = 0
+        self.transactions_count = 0
+
+    def open(self) -> 'RecordStore':
+        self.close()
+        self.file = open(self.filename, 'rb')
+        try:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.calculate_offsets()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def calculate_offsets(self):
+        size = len(self.mmap)
+        self.header_size = self.mmap.find(b'\n') + 1 or size
+        search_end = size - 1 if self.mmap[-1:] == b'\n' else size
+        self.footer_offset = max(self.mmap.rfind(b'\n', self.header_size, search_end) + 1, self.header_size)
+        transactions_size = self.footer_offset - self.header_size
+        if not transactions_size:
+            self.record_size = self.header_size
+            self.transactions_count = 0
+            return
+        self.record_size = self.mmap.find(b'\n', self.header_size, self.footer_offset) + 1 - self.header_size
+        if self.record_size <= 0 or transactions_size % self.record_size:
+            raise ValueError(f'Transactions in {self.filename} are not fixed-width records')
+        self.transactions_count = transactions_size // self.record_size
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def record_offset(self, index: int) -> int:
+        return self.header_size + index * self.record_size
+
+    def clamp_range(self, start: int, stop: int) -> tuple[int, int]:
+        start = min(max(start, 0), self.transactions_count)
+        stop = min(max(stop, start), self.transactions_count)
+        return start, stop
+
+    def read_header(self) -> bytes:
+        return self.mmap[:self.header_size]
+
+    def read_footer(self) -> bytes:
+        return self.mmap[self.footer_offset:]
+
+    def read_transaction(self, index: int) -> bytes:
+        if not 0 <= index < self.transactions_count:
+            raise IndexError(f'Transaction {index} is out of range [0-{self.transactions_count - 1}]')
+        offset = self.record_offset(index)
+        return self.mmap[offset:offset + self.record_size]
+
+    def read_transactions(self, start: int, stop: int) -> bytes:
+        start, stop = self.clamp_range(start, stop)
+        return self.mmap[self.record_offset(start):self.record_offset(stop)]
+
+    def write(self, offset: int, data: bytes, truncate: bool = False):
+        # Overwrite bytes at given offset only, when truncating everything after written data is dropped
+        with open(self.filename, 'r+b') as f:
+            f.seek(offset)
+            instrumentation.count('bytes_written', f.write(data))
+            if truncate:
+                f.truncate()
+        if truncate:
+            self.open()
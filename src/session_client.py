@@ -0,0 +1,42 @@
+import json
+import os
+import socket
+
+
+def default_socket_path(filename: str) -> str:
+    directory, basename = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, f'.{basename}.sock')
+
+
+class SessionClient:
+    # Requests and responses are JSON objects, one per line, connection can be reused for many requests
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.connection = None
+        self.responses = None
+
+    def __enter__(self) -> 'SessionClient':
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.connection.connect(self.socket_path)
+        except OSError:
+            self.connection.close()
+            raise
+        self.responses = self.connection.makefile('rb')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.responses.close()
+        self.connection.close()
+
+    def request(self, request: dict) -> dict:
+        self.connection.sendall(json.dumps(request).encode() + b'\n')
+        response = self.responses.readline()
+        if not response:
+            raise ConnectionError('Session server closed connection')
+        return json.loads(response)
+
+
+def send_request(socket_path: str, request: dict) -> dict:
+    with SessionClient(socket_path) as client:
+        return client.request(request)
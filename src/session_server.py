@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import threading
+
+import record_layout
+from colored_logger import logger
+from file_interactions import FileInteractions
+from file_lock import FileLock
+from session_client import default_socket_path
+
+
+class RequestError(Exception):
+    pass
+
+
+class ErrorCollector(logging.Handler):
+    # Validation errors are logged by FileInteractions, they are collected to be sent back to client,
+    # messages logged by other threads at the same time belong to other requests
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.thread = threading.get_ident()
+        self.messages = []
+
+    def emit(self, record):
+        if record.thread == self.thread:
+            self.messages.append(record.getMessage().strip())
+
+
+class SessionServer:
+    # One loaded file serves many clients, requests are handled one by one by the event loop, so none of them sees
+    # a half applied change. Changes are kept in an edit session and written by a single writer task, changes
+    # arriving within flush delay are written together and their clients get response once they are in file.
+    # File is written in a worker thread, reads are served meanwhile and changes wait until it is written.
+    def __init__(self, filename: str, socket_path: str = None, flush_delay: float = 0.05, parse_processes: int = 1):
+        self.filename = filename
+        self.socket_path = socket_path or default_socket_path(filename)
+        self.flush_delay = flush_delay
+        # Changes made by other processes despite the lock are loaded block by block
+        self.file_interactions = FileInteractions(filename, use_cache=True, parse_processes=parse_processes,
+                                                  track_changes=True)
+        self.file_lock = FileLock(filename)
+        self.handlers = {'get': self.get, 'set': self.set, 'add': self.add, 'query': self.query}
+        self.writing_commands = {'set', 'add'}
+        # Applied changes waiting for writer as (request, result, future of response)
+        self.pending_changes = []
+        self.write_lock = None
+        self.flush_requested = None
+        self.stopped = None
+        self.loop = None
+
+    async def serve(self, handle_signals: bool = False) -> bool:
+        if not self.file_lock.acquire():
+            logger.error('File %s is already served or edited by another process', self.filename)
+            return False
+        try:
+            if not self.file_interactions.read_file():
+                return False
+            self.file_interactions.begin_edit_session()
+            self.loop = asyncio.get_running_loop()
+            self.write_lock = asyncio.Lock()
+            self.flush_requested = asyncio.Event()
+            self.stopped = asyncio.Event()
+            if handle_signals:
+                for signal_number in (signal.SIGINT, signal.SIGTERM):
+                    self.loop.add_signal_handler(signal_number, self.stopped.set)
+            # Socket left by a server which was killed is removed, file lock guarantees it is not in use
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+            writer_task = asyncio.create_task(self.writer())
+            logger.info('Serving %s on %s', self.filename, self.socket_path)
+            async with server:
+                await self.stopped.wait()
+            async with self.write_lock:
+                writer_task.cancel()
+                await self.flush()
+            return True
+        finally:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.file_interactions.remove_change_log()
+            self.file_lock.release()
+
+    def stop(self):
+        # Can be called from any thread
+        self.loop.call_soon_threadsafe(self.stopped.set)
+
+    async def writer(self):
+        while True:
+            await self.flush_requested.wait()
+            await asyncio.sleep(self.flush_delay)
+            self.flush_requested.clear()
+            async with self.write_lock:
+                await self.flush()
+
+    async def flush(self):
+        # Called with write lock held, so nothing changes loaded data while it is written. Loaded data is changed
+        # only here on the event loop, worker thread just writes it, so reads served meanwhile never see it half done
+        pending_changes, self.pending_changes = self.pending_changes, []
+        if not pending_changes:
+            return
+        fi = self.file_interactions
+        responses = self.reapply_changes(pending_changes)
+        edit_session = fi.edit_session
+        edit_session.close()
+        if edit_session.pending_changes_count():
+            result = await self.loop.run_in_executor(None, fi.write_to_file)
+            if edit_session.end(result) is False:
+                responses = [{'ok': False, 'error': 'Changes could not be written, all of them are reverted'}] * \
+                    len(pending_changes)
+        fi.begin_edit_session()
+        for (_, _, future), response in zip(pending_changes, responses):
+            if not future.done():
+                future.set_result(response)
+
+    def reapply_changes(self, pending_changes: list[tuple]) -> list[dict]:
+        fi = self.file_interactions
+        responses = [{'ok': True, 'result': result} for _, result, _ in pending_changes]
+        if not fi.is_file_changed():
+            return responses
+        # Another process wrote the file, changes are applied again to its current version
+        logger.warning('File %s was changed by another process, changes are applied to its new version', self.filename)
+        fi.edit_session.rollback()
+        if not fi.sync_with_file():
+            fi.begin_edit_session()
+            return [{'ok': False, 'error': 'File could not be read again after another process changed it'}] * \
+                len(pending_changes)
+        fi.begin_edit_session()
+        return [self.apply(request) for request, _, _ in pending_changes]
+
+    def sync(self):
+        # Loads changes of other processes, never called while file is being written and only while no applied
+        # change waits for writer
+        fi = self.file_interactions
+        if fi.edit_session.pending_changes_count() or not fi.is_file_changed():
+            return
+        fi.edit_session.close()
+        fi.sync_with_file()
+        fi.begin_edit_session()
+
+    def apply(self, request: dict) -> dict:
+        # Errors are collected only while request is handled, so messages of other requests are not mixed in
+        error_collector = ErrorCollector()
+        logging.getLogger().addHandler(error_collector)
+        try:
+            handler = self.handlers.get(request.get('command'))
+            if handler is None:
+                raise RequestError(f'Command has to be one of {list(self.handlers)}')
+            return {'ok': True, 'result': handler(request)}
+        except Exception as e:
+            return {'ok': False, 'error': '\n'.join(error_collector.messages) or str(e)}
+        finally:
+            logging.getLogger().removeHandler(error_collector)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                response = await self.handle_request(line)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {'ok': False, 'error': f'Request has to be JSON object: {e}'}
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'Request has to be JSON object'}
+        if request.get('command') not in self.writing_commands:
+            if not self.write_lock.locked():
+                self.sync()
+            return self.apply(request)
+        # Changes wait while file is written, client gets response once its change is in file
+        async with self.write_lock:
+            self.sync()
+            response = self.apply(request)
+            if not response['ok']:
+                return response
+            future = self.loop.create_future()
+            self.pending_changes.append((request, response['result'], future))
+            self.flush_requested.set()
+        return await future
+
+    def transaction_position(self, request: dict) -> int:
+        index = request.get('index')
+        transactions_count = len(self.file_interactions.transactions)
+        if not isinstance(index, int) or not 0 <= index < transactions_count:
+            raise RequestError(f'Transaction index has to be in range [0-{transactions_count - 1}]')
+        return index
+
+    def record_row(self, request: dict):
+        fi = self.file_interactions
+        if request.get('record') == 'transaction':
+            return fi.transactions.iloc[self.transaction_position(request)]
+        elif request.get('record') in ('header', 'footer'):
+            return getattr(fi, request['record']).iloc[0]
+        raise RequestError('Record has to be one of header, footer or transaction')
+
+    def get(self, request: dict):
+        fi = self.file_interactions
+        if request.get('record') == 'transaction':
+            # Values are taken from columns directly, building a row Series would take most of the request time
+            position = self.transaction_position(request)
+            record = {column: str(fi.transactions[column].iat[position]) for column in fi.transactions.columns}
+            record['Amount'] = fi.cents_to_amount(fi.transactions['Amount'].iat[position])
+        elif request.get('record') in ('header', 'footer'):
+            # Same values as in file after pending changes are written
+            row = fi.calculate_footer().iloc[0] if request['record'] == 'footer' else fi.header.iloc[0]
+            positions = fi.footer_positions if request['record'] == 'footer' else fi.header_positions
+            record = record_layout.split_record(fi.format_value(row), list(row.index), positions)
+        else:
+            raise RequestError('Record has to be one of header, footer or transaction')
+        field = request.get('field')
+        if field is None:
+            return record
+        if field not in record:
+            raise RequestError(f'Field "{field}" does not exist, available fields: {list(record)}')
+        return record[field]
+
+    def set(self, request: dict) -> str:
+        row = self.record_row(request)
+        field = request.get('field')
+        if field not in row.index:
+            raise RequestError(f'Field "{field}" does not exist, available fields: {list(row.index)}')
+        if not self.file_interactions.change_field_value(row.index.get_loc(field), str(request.get('value')), row):
+            raise RequestError(f'Value of "{field}" was not changed')
+        return 'Changed'
+
+    def add(self, request: dict) -> int:
+        values_dict = {'Amount': str(request.get('amount')), 'Currency': str(request.get('currency')),
+                       'Reserved': str(request.get('reserved', ''))}
+        if self.file_interactions.add_new_transaction(values_dict) == -1:
+            raise RequestError('Transaction was not added')
+        return len(self.file_interactions.transactions) - 1
+
+    def query(self, request: dict) -> dict:
+        fi = self.file_interactions
+        conditions = {name: request.get(name) for name in ('currency', 'min_counter', 'max_counter')}
+        for name in ('min_amount', 'max_amount'):
+            if request.get(name) is not None:
+                conditions[name] = fi.run_validators('Amount', str(request[name]))
+                if conditions[name] is False:
+                    raise RequestError(f'Amount "{request[name]}" is not valid')
+        transactions, summary = fi.query_transactions(**conditions)
+        limit = request.get('limit')
+        shown = fi.to_display(transactions.head(limit) if limit else transactions)
+        summary = fi.to_display(summary)
+        return {'columns': ['Index'] + list(shown.columns),
+                'transactions': [[str(index)] + [str(value) for value in row]
+                                 for index, row in zip(shown.index, shown.itertuples(index=False))],
+                'count': len(transactions),
+                'summary': {currency: {'Count': int(row['Count']), 'Amount': str(row['Amount'])}
+                            for currency, row in summary.iterrows()}}
+
+
+def run_server(filename: str, socket_path: str = None, flush_delay: float = 0.05, parse_processes: int = 1) -> int:
+    server = SessionServer(filename, socket_path, flush_delay, parse_processes)
+    return 0 if asyncio.run(server.serve(handle_signals=True)) else 1
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+class TransactionIndex:
+    # Indexes are built once for loaded transactions, every condition of a query is then answered by binary search
+    # or by ready list of positions, only the most selective condition is checked row by row against the others
+    def __init__(self, transactions: pd.DataFrame):
+        self.transactions = transactions
+        self.amounts = transactions['Amount'].to_numpy()
+        self.counters = transactions['Counter'].to_numpy()
+        self.amount_order = np.argsort(self.amounts, kind='stable')
+        self.sorted_amounts = self.amounts[self.amount_order]
+        self.counter_order = np.argsort(self.counters, kind='stable')
+        self.sorted_counters = self.counters[self.counter_order]
+        currencies = transactions['Currency'].astype('category')
+        self.currency_codes = currencies.cat.codes.to_numpy()
+        self.currency_categories = list(currencies.cat.categories)
+        self.currency_positions = {}
+        order = np.argsort(self.currency_codes, kind='stable')
+        bounds = np.searchsorted(self.currency_codes[order], np.arange(len(currencies.cat.categories) + 1))
+        for code, currency in enumerate(currencies.cat.categories):
+            self.currency_positions[currency] = order[bounds[code]:bounds[code + 1]]
+
+    def range_positions(self, order: np.ndarray, sorted_values: np.ndarray, minimum, maximum) -> np.ndarray:
+        start = 0 if minimum is None else np.searchsorted(sorted_values, minimum, side='left')
+        stop = len(sorted_values) if maximum is None else np.searchsorted(sorted_values, maximum, side='right')
+        return order[start:max(start, stop)]
+
+    def query(self, currency: str = None, min_amount: int = None, max_amount: int = None,
+              min_counter: int = None, max_counter: int = None) -> np.ndarray:
+        # Positions of matching transactions in file order, amounts are given in cents
+        candidates = []
+        if currency is not None:
+            if currency not in self.currency_positions:
+                return np.zeros(0, dtype=np.intp)
+            candidates.append(self.currency_positions[currency])
+        if min_amount is not None or max_amount is not None:
+            candidates.append(self.range_positions(self.amount_order, self.sorted_amounts, min_amount, max_amount))
+        if min_counter is not None or max_counter is not None:
+            candidates.append(self.range_positions(self.counter_order, self.sorted_counters, min_counter, max_counter))
+        if not candidates:
+            return np.arange(len(self.transactions))
+
+        positions = min(candidates, key=len)
+        matches = np.ones(len(positions), dtype=bool)
+        if currency is not None:
+            matches &= self.currency_codes[positions] == self.currency_categories.index(currency)
+        if min_amount is not None:
+            matches &= self.amounts[positions] >= min_amount
+        if max_amount is not None:
+            matches &= self.amounts[positions] <= max_amount
+        if min_counter is not None:
+            matches &= self.counters[positions] >= min_counter
+        if max_counter is not None:
+            matches &= self.counters[positions] <= max_counter
+        return np.sort(positions[matches])
+
+    def summary(self, positions: np.ndarray) -> pd.DataFrame:
+        # Count and sum of amounts in cents per currency
+        transactions = self.transactions.iloc[positions]
+        summary = transactions.groupby('Currency', observed=True)['Amount'].agg(['count', 'sum'])
+        return summary.rename(columns={'count': 'Count', 'sum': 'Amount'})
@@ -0,0 +1,46 @@
+import pandas as pd
+from typing import Union
+
+
+class TransactionPager:
+    # Only requested page is read, so one step costs the same no matter how many transactions file has
+    def __init__(self, file_interactions, page_size: int = 200):
+        self.file_interactions = file_interactions
+        self.page_size = page_size
+        self.page = 0
+
+    def page_count(self) -> int:
+        return max(-(-self.file_interactions.count_transactions() // self.page_size), 1)
+
+    def page_range(self) -> tuple[int, int]:
+        start = self.page * self.page_size
+        return start, min(start + self.page_size, self.file_interactions.count_transactions())
+
+    def current_page(self) -> pd.DataFrame:
+        return self.file_interactions.get_transactions(*self.page_range())
+
+    def next_page(self) -> bool:
+        if self.page + 1 >= self.page_count():
+            return False
+        self.page += 1
+        return True
+
+    def previous_page(self) -> bool:
+        if self.page == 0:
+            return False
+        self.page -= 1
+        return True
+
+    def jump_to_counter(self, counter: int) -> Union[int, None]:
+        index = self.file_interactions.locate_counter(counter)
+        if index is not None:
+            self.page = index // self.page_size
+        return index
+
+    def help_text(self) -> str:
+        start, stop = self.page_range()
+        return f'Page {self.page + 1} of {self.page_count()}, transactions [{start}-{stop - 1}]\n' \
+               f'-1. Return\n' \
+               f'n. Next page\n' \
+               f'p. Previous page\n' \
+               f'j <counter>. Jump to transaction with given Counter\n'
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+
+from batch_processor import BatchTotals, batch_filenames, process_file, process_files
+from cli_commands import create_parser, run_command
+from file_interactions import FileInteractions
+
+
+test_filename = 'tests/test_task_data.txt'
+batch_directory = 'tests/batch'
+
+
+def create_batch_directory():
+    shutil.rmtree(batch_directory, ignore_errors=True)
+    os.makedirs(batch_directory)
+    for day in range(3):
+        shutil.copy(test_filename, f'{batch_directory}/day_{day}.txt')
+    # Footer of test file has wrong Total Counter, written file has it right
+    fi = FileInteractions(f'{batch_directory}/day_0.txt')
+    fi.read_file()
+    fi.write_to_file()
+    with open(f'{batch_directory}/broken.csv', 'wb') as f:
+        f.write(b'\xff\xfe')
+
+
+def test_process_file():
+    report = process_file(test_filename)
+    _, _, transactions = FileInteractions(test_filename).read_file()
+    assert report['transactions'] == len(transactions)
+    for currency, totals in report['currencies'].items():
+        assert totals['Count'] == (transactions['Currency'] == currency).sum()
+        assert totals['Amount'] == transactions.loc[transactions['Currency'] == currency, 'Amount'].sum()
+    assert report['footer_mismatches'] == ['Total Counter is 11, but transactions give 12']
+    assert 'failure' in process_file('tests/missing_file.txt')
+
+
+def test_process_files():
+    create_batch_directory()
+    try:
+        filenames = batch_filenames(batch_directory)
+        assert filenames == [f'{batch_directory}/broken.csv'] + [f'{batch_directory}/day_{day}.txt' for day in range(3)]
+        assert batch_filenames(f'{batch_directory}/day_*.txt') == filenames[1:]
+
+        reports = list(process_files(filenames, processes=2))
+        assert [report['file'] for report in reports] == filenames
+        assert reports == list(process_files(filenames, processes=1))
+        totals = BatchTotals().add_all(reports).to_dict()
+        assert totals['files'] == 4
+        assert totals['failed_files'] == [f'{batch_directory}/broken.csv']
+        assert totals['footer_mismatches'] == filenames[2:]
+        assert totals['transactions'] == 36
+        assert totals['currencies'] == {'EUR': {'Count': 3, 'Amount': 3 * 5353},
+                                        'PLN': {'Count': 33, 'Amount': 3 * 1253981}}
+
+        arguments = create_parser().parse_args(['batch', f'{batch_directory}/day_0.txt', '--json'])
+        assert run_command(arguments) == 0
+        arguments = create_parser().parse_args(['batch', batch_directory, '--processes', '2'])
+        assert run_command(arguments) == 1
+        assert run_command(create_parser().parse_args(['batch', f'{batch_directory}/missing_*'])) == 1
+    finally:
+        shutil.rmtree(batch_directory, ignore_errors=True)
+
+
+def test_batch_command_json_output(capsys):
+    assert run_command(create_parser().parse_args(['batch', test_filename, '--json'])) == 1
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[0]['file'] == test_filename
+    assert lines[-1]['totals']['transactions'] == 12
@@ -0,0 +1,31 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.getcwd(), 'benchmarks'))
+
+import run_benchmarks
+from file_interactions import FileInteractions
+from generate_file import MAX_TRANSACTIONS, generate_file
+
+
+def test_generated_file_is_valid():
+    generate_file('tests/temp_file.txt', 1000, seed=3)
+    fi = FileInteractions('tests/temp_file.txt')
+    assert fi.verify_file() == []
+    _, footer, transactions = fi.read_file()
+    assert footer['Total Counter'].iloc[0] == '001000'
+    assert set(transactions['Currency']) == {'PLN', 'EUR', 'USD'}
+    assert (transactions['Currency'] == 'PLN').mean() > 0.5
+    with pytest.raises(ValueError):
+        generate_file('tests/temp_file.txt', MAX_TRANSACTIONS + 1)
+
+
+def test_compare_with_baseline():
+    baseline = {'results': {'load/10': {'seconds': 1.0, 'peak_memory_bytes': 2 ** 30},
+                            'append/10': {'seconds': 0.001, 'peak_memory_bytes': 100}}}
+    results = {'results': {'load/10': {'seconds': 1.5, 'peak_memory_bytes': 2 ** 30},
+                           'append/10': {'seconds': 0.002, 'peak_memory_bytes': 200},
+                           'verify/10': {'seconds': 9.0, 'peak_memory_bytes': 2 ** 40}}}
+    regressions = run_benchmarks.compare_with_baseline(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith('load/10 seconds')
@@ -0,0 +1,54 @@
+import shutil
+import subprocess
+import sys
+import pytest
+
+from cli_commands import create_parser, run_command
+from file_interactions import FileInteractions
+from quick_reader import QuickReader
+
+
+test_filename = 'tests/test_task_data.txt'
+# Cumulative import time of modules needed for single record commands, in microseconds
+import_time_budget = 200000
+
+
+def test_quick_reader_is_same_as_file_interactions():
+    fi = FileInteractions(test_filename)
+    header, footer, transactions = fi.read_file()
+    with QuickReader(test_filename) as quick_reader:
+        assert quick_reader.get_header() == header.iloc[0].to_dict()
+        assert quick_reader.get_footer() == footer.iloc[0].to_dict()
+        assert quick_reader.count_transactions() == len(transactions)
+        for index in range(len(transactions)):
+            expected = {name: str(value) for name, value in fi.to_display(transactions.iloc[index]).items()}
+            assert quick_reader.get_transaction(index) == expected
+
+
+@pytest.mark.parametrize('arguments, expected_output', [
+    (['get', 'transaction', '1', '--field', 'Amount'], '120.00'),
+    (['get', 'footer', '--field', 'Total Counter'], '000011'),
+])
+def test_get_command_does_not_import_pandas(arguments, expected_output):
+    result = subprocess.run([sys.executable, '-X', 'importtime', 'src/main.py', '--file', test_filename, *arguments],
+                            capture_output=True, text=True)
+    assert result.returncode == 0
+    assert result.stdout.strip() == expected_output
+    import_times = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, module = line.split('|')
+        import_times[module.strip()] = int(cumulative)
+    assert 'pandas' not in import_times and 'numpy' not in import_times
+    assert import_times['cli_commands'] + import_times['colored_logger'] < import_time_budget
+
+
+@pytest.mark.parametrize('parse_processes', ['1', '2'])
+def test_import_command_from_fixed_width_file(parse_processes):
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    args = create_parser().parse_args(['--file', 'tests/temp_file.txt', '--parse-processes', parse_processes,
+                                       'import', test_filename])
+    assert run_command(args) == 0
+    _, footer, transactions = FileInteractions('tests/temp_file.txt').read_file()
+    assert len(transactions) == 24 and footer['Total Counter'].iloc[0] == '000024'
+    assert transactions['Amount'].iloc[12:].tolist() == transactions['Amount'].iloc[:12].tolist()
+    shutil.rmtree('tests/.temp_file.txt.cache')
@@ -0,0 +1,33 @@
+import logging
+import threading
+
+import colored_logger
+from colored_logger import ColoredFormatter, logger
+
+
+def test_colored_formatter_reuses_level_formatters():
+    formatter = ColoredFormatter('%(levelname)s: %(message)s')
+    level_formatters = dict(formatter.level_formatters)
+    record = logging.makeLogRecord({'levelname': 'ERROR', 'msg': 'value %s', 'args': (1,)})
+    assert formatter.format(record) == '\033[91mERROR: value 1\033[0m'
+    assert formatter.level_formatters == level_formatters
+
+
+def test_messages_are_formatted_in_listener_thread():
+    formatting_threads = []
+
+    class Value:
+        def __str__(self):
+            formatting_threads.append(threading.current_thread())
+            return 'value'
+
+    colored_logger.set_level('ERROR')
+    try:
+        logger.info('Not shown %s', Value())
+        colored_logger.flush()
+        assert formatting_threads == []
+    finally:
+        colored_logger.set_level('DEBUG')
+    logger.debug('Shown %s', Value())
+    colored_logger.flush()
+    assert any(thread is not threading.current_thread() for thread in formatting_threads)
@@ -1,11 +1,19 @@
+import os
+import shutil
 import pytest
 import pandas as pd
 import numpy as np
 
+import parallel_reader
+from change_log import ChangeLog
 from file_interactions import FileInteractions
+from record_store import RecordStore
+from transaction_pager import TransactionPager
 
 
 test_filename = 'tests/test_task_data.txt'
+transactions_dtypes = {'Field id': pd.CategoricalDtype(['02']), 'Counter': 'int32', 'Amount': 'int64',
+                       'Currency': pd.CategoricalDtype(['USD', 'EUR', 'PLN']), 'Reserved': object}
 
 
 @pytest.mark.parametrize('filename, expected', [(test_filename, True), ('tests/test_task_dataa.txt', False)])
@@ -20,8 +28,8 @@ def test_read_file():
     header_expected_data = {'Field id': '01', 'Name': 'name', 'Surname': 'surname',
                             'Patronymic': 'patronymic', 'Address': 'address'}
     transactions_expected_data = {'Field id': ['02'] * 12, 'Counter': range(1, 13),
-                                  'Amount': [20.0, 120.0, 220.0, 320.0, 420.0, 4212.35, 4142.59,
-                                             720.0, 424.87, 920.0, 1020.0, 53.53],
+                                  'Amount': [2000, 12000, 22000, 32000, 42000, 421235, 414259,
+                                             72000, 42487, 92000, 102000, 5353],
                                   'Currency': ['PLN', 'PLN', 'PLN', 'PLN', 'PLN', 'PLN', 'PLN',
                                                'PLN', 'PLN', 'PLN', 'PLN', 'EUR'],
                                   'Reserved': [''] * 12}
@@ -31,7 +39,7 @@ def test_read_file():
     transactions_expected = pd.DataFrame(data=transactions_expected_data)
     footer_expected = pd.DataFrame(data=footer_expected_data, index=[0])
     assert header.equals(header_expected) == True
-    assert transactions.equals(transactions_expected.astype(object)) == True
+    assert transactions.equals(transactions_expected.astype(transactions_dtypes)) == True
     assert footer.equals(footer_expected) == True
 
 
@@ -44,12 +52,12 @@ def test_add_new_transaction():
     assert (True if fi.add_new_transaction(values_dict) else False) == True
     _, _, transactions = fi.read_file()
     transactions_expected_data = {'Field id': ['02'] * 13, 'Counter': range(1, 14),
-                                  'Amount': [20.0, 120.0, 220.0, 320.0, 420.0, 4212.35, 4142.59,
-                                             720.0, 424.87, 920.0, 1020.0, 53.53, 23412.12],
+                                  'Amount': [2000, 12000, 22000, 32000, 42000, 421235, 414259,
+                                             72000, 42487, 92000, 102000, 5353, 2341212],
                                   'Currency': ['PLN', 'PLN', 'PLN', 'PLN', 'PLN', 'PLN', 'PLN',
                                                'PLN', 'PLN', 'PLN', 'PLN', 'EUR', 'PLN'],
                                   'Reserved': [''] * 13}
-    assert transactions.equals(pd.DataFrame(transactions_expected_data).astype(object)) == True
+    assert transactions.equals(pd.DataFrame(transactions_expected_data).astype(transactions_dtypes)) == True
 
 
 def test_change_field_value():
@@ -70,9 +78,388 @@ def test_change_field_value():
     # Check if all is written back to file
     _, _, transactions = fi.read_file()
     transactions_expected_data = {'Field id': ['02'] * 12, 'Counter': range(1, 13),
-                                  'Amount': [20.0, 120.0, 220.0, 320.0, 420.0, 4212.35, 4142.59,
-                                             720.0, 424.87, 920.0, 4123.22, 53.53],
+                                  'Amount': [2000, 12000, 22000, 32000, 42000, 421235, 414259,
+                                             72000, 42487, 92000, 412322, 5353],
                                   'Currency': ['PLN', 'PLN', 'PLN', 'PLN', 'PLN', 'PLN', 'PLN',
                                                'PLN', 'PLN', 'PLN', 'PLN', 'EUR'],
                                   'Reserved': [''] * 12}
-    assert transactions.equals(pd.DataFrame(transactions_expected_data).astype(object))
+    assert transactions.equals(pd.DataFrame(transactions_expected_data).astype(transactions_dtypes))
+
+
+def test_parse_transactions_fixed_width_and_fallback_are_equal():
+    fi = FileInteractions(test_filename)
+    _, _, transactions = fi.read_file()
+    with open(test_filename, 'r') as f:
+        lines = f.readlines()
+    assert fi.parse_transaction_lines(lines[1:-1]).equals(transactions)
+    # Non-ascii record makes byte offsets differ from character offsets, so parser has to fall back to line slicing
+    lines[1] = lines[1][:23] + 'zażółć'.rjust(97) + '\n'
+    fallback_transactions = fi.parse_transactions(''.join(lines[1:-1]).encode())
+    assert fallback_transactions.loc[0, 'Reserved'] == 'zażółć'
+    assert fallback_transactions.iloc[1:].equals(transactions.iloc[1:])
+
+
+def test_lazy_record_access():
+    fi = FileInteractions(test_filename)
+    assert fi.open_records() == True
+    assert fi.count_transactions() == 12
+    lazy_header, lazy_footer = fi.get_header(), fi.get_footer()
+    lazy_chunk = fi.get_transactions(5, 9)
+    lazy_transaction = fi.get_transaction(11)
+    fi.close_records()
+    header, footer, transactions = fi.read_file()
+    assert lazy_header.equals(header)
+    assert lazy_footer.equals(footer)
+    assert lazy_chunk.equals(transactions.iloc[5:9])
+    assert lazy_transaction.equals(transactions.iloc[11])
+    assert lazy_transaction.name == 11
+    assert FileInteractions('tests/test_task_dataa.txt').open_records() == False
+
+
+def test_records_are_patched_in_place():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    fi = FileInteractions('tests/temp_file.txt')
+    _, _, transactions = fi.read_file()
+    with open('tests/temp_file.txt', 'rb') as f:
+        original_lines = f.readlines()
+    assert fi.change_field_value(2, '100.5', transactions.iloc[3])
+    assert fi.add_new_transaction({'Amount': '12.34', 'Currency': 'USD', 'Reserved': ''})
+    with open('tests/temp_file.txt', 'rb') as f:
+        patched_lines = f.readlines()
+    # Only changed record, footer and appended record differ from original file, record sizes are kept
+    assert patched_lines[:4] + patched_lines[5:-2] == original_lines[:4] + original_lines[5:-1]
+    assert patched_lines[4] == b'02000004000000010050PLN'.ljust(123) + b'\n'
+    assert patched_lines[-2] == b'02000013000000001234USD'.ljust(123) + b'\n'
+    assert patched_lines[-1] == b'03000013000001238618' + b'reserved'.rjust(100) + b'\n'
+    header, footer, transactions = fi.read_file()
+    assert FileInteractions(test_filename).read_file()[0].equals(header)
+    assert transactions['Amount'].iloc[3] == 10050
+    assert transactions['Amount'].iloc[-1] == 1234
+    # Patched file must be the same as fully rewritten one
+    fi.write_to_file()
+    with open('tests/temp_file.txt', 'rb') as f:
+        assert f.readlines() == patched_lines
+
+
+def test_format_records_is_same_as_format_value():
+    fi = FileInteractions(test_filename)
+    _, _, transactions = fi.read_file()
+    assert fi.format_records(transactions) == ''.join(transactions.apply(lambda row: fi.format_value(row), axis=1)).encode()
+    transactions = transactions.astype(object)
+    transactions.loc[3, 'Currency'] = 'too long currency'
+    for df in [transactions, transactions.iloc[:3]]:
+        assert fi.format_records(df) == ''.join(df.apply(lambda row: fi.format_value(row), axis=1)).encode()
+    # Integers which do not fit their fields are refused, as text they would break the record
+    for column, value in [('Counter', -5), ('Amount', -500), ('Amount', 12345678901234)]:
+        with pytest.raises(ValueError):
+            fi.format_records(transactions.assign(**{column: value}))
+    # Non-ascii values are wider in bytes than in characters
+    transactions.loc[6, 'Reserved'] = 'zażółć'
+    assert fi.format_records(transactions) == ''.join(transactions.apply(lambda row: fi.format_value(row), axis=1)).encode()
+
+
+def test_read_file_in_chunks():
+    fi = FileInteractions(test_filename)
+    reader = fi.read_file_in_chunks(chunk_size=5)
+    chunks = list(reader)
+    header, footer, transactions = fi.read_file()
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+    assert pd.concat(chunks).equals(transactions)
+    assert reader.header.equals(header)
+    assert reader.footer.equals(footer)
+    assert reader.total_counter == 12
+    assert reader.control_sum == 1259334
+    assert reader.footer_mismatches() == {'Total Counter': ('000011', 12)}
+    assert [len(chunk) for chunk in fi.read_file_in_chunks(chunk_size=12)] == [12]
+
+
+def test_edit_session_commit_and_rollback():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    fi = FileInteractions('tests/temp_file.txt')
+    header, _, transactions = fi.read_file()
+    writes = []
+    write_to_file = fi.write_to_file
+    fi.write_to_file = lambda: writes.append(1) or write_to_file()
+
+    with fi.begin_edit_session():
+        assert fi.change_field_value(2, '1.5', transactions.iloc[0])
+        assert fi.change_field_value(3, 'USD', transactions.iloc[1])
+        assert fi.change_field_value(1, 'new name', header.iloc[0])
+        assert fi.add_new_transaction({'Amount': '3', 'Currency': 'EUR', 'Reserved': ''})
+        # Nothing is written until session is committed
+        assert FileInteractions('tests/temp_file.txt').read_file()[2].equals(FileInteractions(test_filename).read_file()[2])
+    assert len(writes) == 1
+    assert fi.edit_session is None
+    header, footer, transactions = FileInteractions('tests/temp_file.txt').read_file()
+    assert transactions['Amount'].iloc[0] == 150
+    assert transactions['Currency'].iloc[1] == 'USD'
+    assert header['Name'].iloc[0] == 'new name'
+    assert len(transactions) == 13
+    assert footer['Total Counter'].iloc[0] == '000013'
+
+    edit_session = fi.begin_edit_session()
+    assert fi.change_field_value(2, '99', fi.transactions.iloc[0])
+    assert fi.add_new_transaction({'Amount': '3', 'Currency': 'EUR', 'Reserved': ''})
+    edit_session.rollback()
+    assert len(writes) == 1
+    assert fi.transactions.equals(transactions)
+    assert fi.total_counter == 13
+    assert not [name for name in os.listdir('tests') if name.startswith('.temp_file.txt')]
+
+
+def test_parsed_file_cache():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    shutil.rmtree('tests/.temp_file.txt.cache', ignore_errors=True)
+    fi = FileInteractions('tests/temp_file.txt', use_cache=True)
+    header, footer, transactions = fi.read_file()
+    assert os.path.exists('tests/.temp_file.txt.cache/meta.json')
+    cached_fi = FileInteractions('tests/temp_file.txt', use_cache=True)
+    cached_fi.parse_transactions = None
+    cached_header, cached_footer, cached_transactions = cached_fi.read_file()
+    assert cached_header.equals(header)
+    assert cached_footer.equals(footer)
+    assert cached_transactions.equals(transactions)
+    # Every write makes cache invalid, file is parsed again and cache refreshed on next read
+    assert cached_fi.change_field_value(2, '1.5', cached_transactions.iloc[0])
+    assert not os.path.exists('tests/.temp_file.txt.cache/meta.json')
+    _, _, transactions = FileInteractions('tests/temp_file.txt', use_cache=True).read_file()
+    assert transactions['Amount'].iloc[0] == 150
+    assert FileInteractions('tests/temp_file.txt', use_cache=True).read_file()[2].equals(transactions)
+
+    # DataFrame loaded from cache keeps its values when cache is saved again for changed file
+    cached_transactions = FileInteractions('tests/temp_file.txt', use_cache=True).read_file()[2]
+    other_fi = FileInteractions('tests/temp_file.txt')
+    other_fi.read_file()
+    assert other_fi.change_field_value(2, '777', other_fi.transactions.iloc[0])
+    FileInteractions('tests/temp_file.txt', use_cache=True).read_file()
+    assert cached_transactions['Amount'].iloc[0] == 150
+    assert FileInteractions('tests/temp_file.txt', use_cache=True).read_file()[2]['Amount'].iloc[0] == 77700
+    assert len(os.listdir('tests/.temp_file.txt.cache')) == 2
+    shutil.rmtree('tests/.temp_file.txt.cache')
+
+
+def test_parallel_parsing():
+    _, _, transactions = FileInteractions(test_filename).read_file()
+    fi = FileInteractions(test_filename, parse_processes=2)
+    assert fi.read_file()[2].equals(transactions)
+    record_store = RecordStore(test_filename).open()
+    shard_transactions, shard_checks = parallel_reader.parse_transactions_parallel(fi, record_store, 2, shard_size=5)
+    record_store.close()
+    assert shard_transactions.equals(transactions)
+    assert [(check['first_index'], check['count']) for check in shard_checks] == [(0, 5), (5, 5), (10, 2)]
+    assert sum(check['control_sum'] for check in shard_checks) == 1259334
+    assert not any(check['wrong_counters'] for check in shard_checks)
+
+
+def test_verify_file():
+    assert FileInteractions(test_filename).verify_file() == [
+        {'line': 14, 'field': 'Total Counter', 'error': 'Total Counter is 11, but transactions give 12'}]
+    with open(test_filename, 'r') as f:
+        lines = f.readlines()
+    lines[1] = '03' + lines[1][2:]
+    lines[2] = lines[2][:8] + '00000000x000' + lines[2][20:]
+    lines[3] = lines[3][:20] + 'AUS' + lines[3][23:]
+    lines[4] = lines[4][:2] + '000009' + lines[4][8:]
+    lines[5] = lines[5][:50] + '\n'
+    lines[6] = lines[6][:-2] + 'x\n'
+    lines[7] = lines[7][:30] + 'ż' + lines[7][31:]
+    with open('tests/temp_file.txt', 'w') as f:
+        f.writelines(lines)
+    errors = FileInteractions('tests/temp_file.txt').verify_file()
+    assert [(error['line'], error['field']) for error in errors] == [
+        (2, 'Field id'), (3, 'Amount'), (4, 'Currency'), (5, 'Counter'), (6, None), (7, None),
+        (14, 'Total Counter'), (14, 'Control Sum')]
+    assert errors[3]['error'] == 'Counter is 9, expected 4'
+
+
+def test_control_sum_is_updated_incrementally():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    fi = FileInteractions('tests/temp_file.txt')
+    _, _, transactions = fi.read_file()
+    assert fi.control_sum == 1259334
+    fi.change_field_value(2, '0.5', transactions.iloc[0])
+    fi.add_new_transaction({'Amount': '10', 'Currency': 'EUR', 'Reserved': ''})
+    assert fi.control_sum == 1259334 - 2000 + 50 + 1000 == fi.transactions['Amount'].sum()
+    edit_session = fi.begin_edit_session()
+    fi.add_new_transaction({'Amount': '10', 'Currency': 'EUR', 'Reserved': ''})
+    edit_session.rollback()
+    assert fi.control_sum == fi.transactions['Amount'].sum()
+    assert fi.verify_file() == []
+
+
+def test_add_new_transactions():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    fi = FileInteractions('tests/temp_file.txt')
+    fi.read_file()
+    invalid = pd.DataFrame({'Amount': ['1.5', 'abc', '2'], 'Currency': ['EUR', 'USD', 'AUS'], 'Reserved': ''})
+    assert fi.add_new_transactions(invalid) == -1
+    assert len(fi.transactions) == 12
+    negative = pd.DataFrame({'Amount': ['1', '-5', '-0.01'], 'Currency': 'EUR', 'Reserved': ''})
+    assert fi.add_new_transactions(negative) == -1
+    assert fi.add_new_transaction({'Amount': '-5', 'Currency': 'EUR', 'Reserved': ''}) == -1
+    assert (len(fi.transactions), fi.control_sum) == (12, 1259334)
+    assert FileInteractions('tests/temp_file.txt').read_file()[2].equals(fi.transactions)
+
+    values = pd.DataFrame({'Amount': ['1.5', '2.335', '100'], 'Currency': ['EUR', 'USD', 'PLN'],
+                           'Reserved': ''})
+    assert fi.add_new_transactions(values) == 'Successfuly written to file'
+    assert fi.transactions['Counter'].tolist()[-3:] == [13, 14, 15]
+    assert fi.transactions['Amount'].tolist()[-3:] == [150, 234, 10000]
+    assert fi.transactions.dtypes.to_dict() == transactions_dtypes
+    assert fi.control_sum == 1259334 + 150 + 234 + 10000
+    assert FileInteractions('tests/temp_file.txt').read_file()[2].equals(fi.transactions)
+
+    # Counter field of two digits holds at most 99 transactions
+    fi.max_lengths_dict['Counter'] = 2
+    many = pd.DataFrame({'Amount': ['1'] * 85, 'Currency': 'EUR', 'Reserved': ''})
+    assert fi.add_new_transactions(many) == -1
+    assert fi.add_new_transaction({'Amount': '1', 'Currency': 'EUR', 'Reserved': ''}) != -1
+    assert len(fi.transactions) == 16
+    assert fi.add_new_transactions(many.iloc[2:]) == 'Successfuly written to file'
+    assert fi.add_new_transaction({'Amount': '1', 'Currency': 'EUR', 'Reserved': ''}) == -1
+    assert len(fi.transactions) == 99
+
+
+def test_run_validators_on_batch():
+    fi = FileInteractions(test_filename)
+    amounts = pd.Series(['1.5', ' 2 ', '0.125', '1e30', 'inf', 'abc', '-1'])
+    assert fi.run_validators('Amount', amounts) is False
+    assert fi.run_validators('Amount', amounts[:3]).tolist() == [150, 200, 12]
+    assert fi.run_validators('Counter', pd.Series(['1'])) is False
+    assert fi.run_validators('Currency', pd.Series(['EUR', 'PLN'])).tolist() == ['EUR', 'PLN']
+    assert fi.run_validators('Currency', pd.Series(['EUR', 'AUS'])) is False
+    assert fi.run_validators('Reserved', pd.Series(['x' * 101])) is False
+
+
+@pytest.mark.parametrize('conditions', [
+    {},
+    {'currency': 'PLN'},
+    {'currency': 'AUS'},
+    {'min_amount': 20000, 'max_amount': 42487},
+    {'currency': 'PLN', 'min_amount': 30000, 'min_counter': 3, 'max_counter': 9},
+    {'max_counter': 0},
+])
+def test_query_transactions(conditions):
+    fi = FileInteractions(test_filename)
+    _, _, transactions = fi.read_file()
+    is_matching = pd.Series(True, index=transactions.index)
+    if 'currency' in conditions:
+        is_matching &= transactions['Currency'] == conditions['currency']
+    for column, name in (('Amount', 'amount'), ('Counter', 'counter')):
+        is_matching &= transactions[column] >= conditions.get(f'min_{name}', transactions[column].min())
+        is_matching &= transactions[column] <= conditions.get(f'max_{name}', transactions[column].max())
+    matching, summary = fi.query_transactions(**conditions)
+    assert matching.equals(transactions[is_matching])
+    assert summary['Count'].sum() == is_matching.sum()
+    assert summary['Amount'].sum() == transactions.loc[is_matching, 'Amount'].sum()
+
+
+def test_query_index_is_rebuilt_after_change():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    fi = FileInteractions('tests/temp_file.txt')
+    _, _, transactions = fi.read_file()
+    assert len(fi.query_transactions(currency='USD')[0]) == 0
+    fi.change_field_value(3, 'USD', transactions.iloc[0])
+    fi.add_new_transaction({'Amount': '10', 'Currency': 'USD', 'Reserved': ''})
+    matching, summary = fi.query_transactions(currency='USD')
+    assert matching['Counter'].tolist() == [1, 13]
+    assert summary.loc['USD'].tolist() == [2, 2000 + 1000]
+
+
+def test_transaction_pager():
+    fi = FileInteractions(test_filename)
+    assert fi.open_records()
+    pager = TransactionPager(fi, page_size=5)
+    assert pager.page_count() == 3
+    assert not pager.previous_page()
+    assert pager.current_page().index.tolist() == [0, 1, 2, 3, 4]
+    assert pager.next_page() and pager.next_page() and not pager.next_page()
+    assert pager.page_range() == (10, 12)
+    assert pager.current_page()['Counter'].tolist() == [11, 12]
+    assert pager.jump_to_counter(7) == 6 and pager.page == 1
+    assert pager.jump_to_counter(13) is None and pager.page == 1
+    fi.close_records()
+
+    _, _, transactions = fi.read_file()
+    transactions.at[0, 'Counter'] = 99
+    assert pager.jump_to_counter(99) == 0 and pager.page == 0
+
+
+def test_write_does_not_fail_when_change_log_can_not_be_written():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    os.makedirs('tests/.temp_file.txt.changes', exist_ok=True)
+    try:
+        fi = FileInteractions('tests/temp_file.txt', track_changes=True)
+        fi.read_file()
+        assert fi.change_field_value(2, '1.5', fi.transactions.iloc[0])
+        assert fi.add_new_transaction({'Amount': '3', 'Currency': 'EUR', 'Reserved': ''}) != -1
+        assert fi.write_to_file()
+        assert FileInteractions('tests/temp_file.txt').read_file()[2].equals(fi.transactions)
+    finally:
+        os.rmdir('tests/.temp_file.txt.changes')
+
+
+def test_sync_with_file_changed_by_another_process():
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    fi = FileInteractions('tests/temp_file.txt', track_changes=True)
+    fi.checksum_block_size = 4
+    fi.read_file()
+    other = FileInteractions('tests/temp_file.txt')
+    other.read_file()
+    assert other.change_field_value(2, '1.5', other.transactions.iloc[5])
+    assert other.add_new_transaction({'Amount': '3', 'Currency': 'EUR', 'Reserved': ''})
+
+    # Patched records are logged, so only changed record and appended record are parsed again, without comparing
+    # checksums of all blocks
+    parsed = []
+    parse_transactions = fi.parse_transactions
+    fi.parse_transactions = lambda block: parsed.append(block.count(b'\n')) or parse_transactions(block)
+    fi.block_checksums.changed_ranges = None
+    assert fi.sync_with_file()
+    assert parsed == [1, 1]
+    header, footer, transactions = FileInteractions('tests/temp_file.txt').read_file()
+    assert fi.transactions.equals(transactions)
+    assert fi.footer.equals(footer)
+    assert (fi.total_counter, fi.control_sum) == (13, int(transactions['Amount'].sum()))
+    assert fi.sync_with_file()
+    assert parsed == [1, 1]
+
+    # Without log, whole block with changed record is found by checksums
+    del fi.block_checksums.changed_ranges
+    os.remove('tests/.temp_file.txt.changes')
+    assert other.change_field_value(2, '4.5', other.transactions.iloc[6])
+    assert fi.sync_with_file()
+    assert parsed == [1, 1, 4]
+    assert fi.transactions['Amount'].iloc[6] == 450
+    assert fi.control_sum == int(fi.transactions['Amount'].sum())
+
+    # Write based on stale data is refused, changes of the other process stay in file
+    assert other.change_field_value(2, '2.5', other.transactions.iloc[0])
+    row = fi.transactions.iloc[1]
+    assert not fi.change_field_value(2, '7', row)
+    assert fi.add_new_transaction({'Amount': '3', 'Currency': 'EUR', 'Reserved': ''}) == -1
+    assert fi.transactions['Amount'].iloc[1] == row['Amount'] == 12000
+    assert (len(fi.transactions), fi.control_sum) == (13, int(fi.transactions['Amount'].sum()))
+    assert not fi.write_to_file()
+    transactions = FileInteractions('tests/temp_file.txt').read_file()[2]
+    assert transactions['Amount'].iloc[:2].tolist() == [250, 12000]
+    assert fi.sync_with_file()
+    assert fi.transactions.equals(transactions)
+    assert fi.change_field_value(2, '7', fi.transactions.iloc[1])
+    assert FileInteractions('tests/temp_file.txt').read_file()[2]['Amount'].iloc[:2].tolist() == [250, 700]
+
+    # Log started anew by full rewrite keeps its mode
+    os.chmod('tests/.temp_file.txt.changes', 0o664)
+    assert fi.write_to_file()
+    assert os.stat('tests/.temp_file.txt.changes').st_mode & 0o777 == 0o664
+
+    # Log is started anew when it grows too big, sync then compares checksums of all blocks once
+    assert other.read_file()
+    other.change_log_max_size = 1
+    assert other.change_field_value(2, '5.5', other.transactions.iloc[7])
+    assert other.change_field_value(2, '6.5', other.transactions.iloc[8])
+    assert ChangeLog('tests/temp_file.txt').read(fi.change_log_position) is None
+    assert fi.sync_with_file()
+    assert fi.transactions.equals(other.transactions)
+    fi.remove_change_log()
+    assert not os.path.exists('tests/.temp_file.txt.changes')
@@ -0,0 +1,43 @@
+import shutil
+import pytest
+
+import instrumentation
+from file_interactions import FileInteractions
+
+
+test_filename = 'tests/test_task_data.txt'
+
+
+@pytest.fixture
+def enabled_instrumentation():
+    instrumentation.reset()
+    instrumentation.enabled = True
+    yield
+    instrumentation.enabled = False
+    instrumentation.reset()
+
+
+def test_nothing_is_collected_when_disabled():
+    instrumentation.reset()
+    FileInteractions(test_filename).read_file()
+    with instrumentation.span('test'):
+        instrumentation.count('test')
+    assert instrumentation.summary() == {'spans': {}, 'counters': {}}
+
+
+def test_hot_paths_are_measured(enabled_instrumentation):
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    fi = FileInteractions('tests/temp_file.txt')
+    _, _, transactions = fi.read_file()
+    fi.change_field_value(2, '1.5', transactions.iloc[0])
+    fi.write_to_file()
+    with instrumentation.span('test'):
+        instrumentation.count('test', 2)
+
+    summary = instrumentation.summary()
+    for name in ('parse', 'parse.transactions', 'convert', 'validate', 'write.patch', 'format', 'write', 'test'):
+        assert summary['spans'][name]['count'] >= 1
+        assert summary['spans'][name]['total_seconds'] >= summary['spans'][name]['max_seconds'] > 0
+    assert summary['counters']['records_parsed'] == 12
+    assert summary['counters']['bytes_written'] > 12 * 120
+    assert summary['counters']['test'] == 2
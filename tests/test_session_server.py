@@ -0,0 +1,132 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cli_commands import create_parser, run_command
+from file_interactions import FileInteractions
+from file_lock import FileLock
+from session_client import SessionClient, send_request
+from session_server import SessionServer
+
+
+test_filename = 'tests/test_task_data.txt'
+socket_path = 'tests/.temp_file.txt.sock'
+
+
+def start_server(flush_delay: float = 0.01) -> tuple[SessionServer, threading.Thread]:
+    shutil.copy(test_filename, 'tests/temp_file.txt')
+    shutil.rmtree('tests/.temp_file.txt.cache', ignore_errors=True)
+    server = SessionServer('tests/temp_file.txt', socket_path, flush_delay=flush_delay)
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(),))
+    thread.start()
+    # Socket file appears before server listens on it
+    for _ in range(500):
+        try:
+            with SessionClient(socket_path):
+                break
+        except OSError:
+            time.sleep(0.01)
+    return server, thread
+
+
+def stop_server(server: SessionServer, thread: threading.Thread):
+    server.stop()
+    thread.join()
+    shutil.rmtree('tests/.temp_file.txt.cache', ignore_errors=True)
+    assert not os.path.exists('tests/.temp_file.txt.changes')
+
+
+def change_amount_without_lock(index: int, amount: str):
+    other = FileInteractions('tests/temp_file.txt')
+    other.read_file()
+    assert other.change_field_value(2, amount, other.transactions.iloc[index])
+
+
+def test_session_server():
+    server, thread = start_server()
+    try:
+        assert send_request(socket_path, {'command': 'get', 'record': 'transaction', 'index': 1,
+                                          'field': 'Amount'}) == {'ok': True, 'result': '120.00'}
+        # Footer is given as it will be written, test file has wrong Total Counter
+        assert send_request(socket_path, {'command': 'get', 'record': 'footer', 'field': 'Total Counter'})['result'] \
+               == '000012'
+
+        # Clients writing at the same time are served one by one and all changes get to the file
+        def add(amount):
+            with SessionClient(socket_path) as client:
+                return client.request({'command': 'add', 'amount': amount, 'currency': 'EUR', 'reserved': ''})
+        with ThreadPoolExecutor(4) as executor:
+            responses = list(executor.map(add, ['1', '2', '3', '4', '5', '6', '7', '8']))
+        assert all(response['ok'] for response in responses)
+        assert sorted(response['result'] for response in responses) == list(range(12, 20))
+        assert send_request(socket_path, {'command': 'set', 'record': 'transaction', 'index': 0, 'field': 'Amount',
+                                          'value': '1.5'}) == {'ok': True, 'result': 'Changed'}
+        _, footer, transactions = FileInteractions('tests/temp_file.txt').read_file()
+        assert len(transactions) == 20
+        assert transactions['Amount'].iloc[0] == 150
+        assert sorted(transactions['Amount'].iloc[12:]) == [100, 200, 300, 400, 500, 600, 700, 800]
+        assert footer['Total Counter'].iloc[0] == '000020'
+
+        response = send_request(socket_path, {'command': 'set', 'record': 'transaction', 'index': 0, 'field': 'Amount',
+                                              'value': 'abc'})
+        assert not response['ok']
+        assert response['error']
+        assert not send_request(socket_path, {'command': 'get', 'record': 'transaction', 'index': 20})['ok']
+
+        query = send_request(socket_path, {'command': 'query', 'currency': 'EUR', 'min_amount': '1'})['result']
+        assert query['count'] == len(query['transactions'])
+        assert query['summary']['EUR']['Count'] == query['count']
+
+        # File is held by server, so other writers are refused and changes of command line go through server
+        assert not FileLock('tests/temp_file.txt').acquire()
+        arguments = create_parser().parse_args(['--file', 'tests/temp_file.txt', '--socket', socket_path,
+                                                'set', 'transaction', '1', 'Currency', 'USD'])
+        assert run_command(arguments) == 0
+        assert FileInteractions('tests/temp_file.txt').read_file()[2]['Currency'].iloc[1] == 'USD'
+    finally:
+        stop_server(server, thread)
+    assert not os.path.exists(socket_path)
+    with FileLock('tests/temp_file.txt'):
+        pass
+
+
+def test_session_server_follows_changes_of_other_processes():
+    server, thread = start_server()
+    try:
+        assert send_request(socket_path, {'command': 'set', 'record': 'transaction', 'index': 0, 'field': 'Amount',
+                                          'value': '1.5'})['ok']
+        change_amount_without_lock(3, '3.5')
+        assert send_request(socket_path, {'command': 'get', 'record': 'transaction', 'index': 3,
+                                          'field': 'Amount'})['result'] == '3.50'
+        assert send_request(socket_path, {'command': 'set', 'record': 'transaction', 'index': 1, 'field': 'Amount',
+                                          'value': '2.5'})['ok']
+    finally:
+        stop_server(server, thread)
+    transactions = FileInteractions('tests/temp_file.txt').read_file()[2]
+    assert transactions['Amount'].iloc[:4].tolist() == [150, 250, 22000, 350]
+
+
+def test_session_server_applies_pending_changes_to_changed_file():
+    server, thread = start_server(flush_delay=0.5)
+    # Loaded data is changed only by the event loop, never by worker thread writing the file
+    sync_threads = []
+    sync_with_file = server.file_interactions.sync_with_file
+    server.file_interactions.sync_with_file = lambda: sync_threads.append(threading.current_thread()) or sync_with_file()
+    try:
+        with ThreadPoolExecutor(1) as executor:
+            response = executor.submit(send_request, socket_path, {'command': 'add', 'amount': '1', 'currency': 'EUR'})
+            # File is changed after change was applied in server, but before it is written
+            time.sleep(0.2)
+            change_amount_without_lock(3, '3.5')
+            change_amount_without_lock(4, '4.5')
+            assert response.result() == {'ok': True, 'result': 12}
+        assert sync_threads == [thread]
+    finally:
+        stop_server(server, thread)
+    _, footer, transactions = FileInteractions('tests/temp_file.txt').read_file()
+    assert transactions['Amount'].iloc[3:5].tolist() == [350, 450]
+    assert transactions['Amount'].iloc[12] == 100
+    assert int(footer['Control Sum'].iloc[0]) == transactions['Amount'].sum()
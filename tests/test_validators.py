@@ -1,4 +1,5 @@
 import pytest
+import pandas as pd
 
 import custom_validators
 
@@ -37,3 +38,23 @@ def test_validate_locked_column_name(test_value, expected):
 @pytest.mark.parametrize('test_value, expected', zip(test_values, available_currencies_expected_answer))
 def test_validate_available_currency(test_value, expected):
     assert (test_value in available_currencies) == expected
+
+
+def test_batch_validators_are_same_as_scalar_validators():
+    values = pd.Series(test_values)
+    assert custom_validators.validate_integers(values).tolist() == integer_expected_answer
+    is_float, numbers = custom_validators.validate_floats(values)
+    assert is_float.tolist() == float_expected_answer
+    assert numbers[is_float].tolist() == [123, 12.21, 123, 123.21]
+    assert custom_validators.validate_lengths(values[:6], 3).tolist() == [
+        custom_validators.validate_length(value, 3) for value in test_values[:6]]
+    assert custom_validators.validate_locked_column_names(test_values, column_names).tolist() == [
+        not expected for expected in locked_column_names_expected_answer]
+    assert custom_validators.validate_available_currencies(values, available_currencies).tolist() == \
+        available_currencies_expected_answer
+
+
+def test_validate_available_currencies_categorical():
+    values = pd.Series(['USD', 'AUS', None, 'PLN', 'USD'], dtype='category')
+    assert custom_validators.validate_available_currencies(values, available_currencies).tolist() == [
+        True, False, False, True, True]